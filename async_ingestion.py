@@ -0,0 +1,419 @@
+import os
+import json
+import time
+import random
+import asyncio
+import functools
+import collections
+from io import BytesIO
+from types import SimpleNamespace
+import pandas as pd
+from data_sources import (NOT_MODIFIED, RETRY_STATUS_CODES, DataSource, SourceFile,
+                          DownloadScheduler, is_throttled, rate_limit_wait, conditional_headers,
+                          tree_listing_url, parse_contents_listing, parse_tree_listing)
+from data_store import compressed_path, read_local_csv
+from data_ingestion import (MANIFEST_FILE, KEY_FILES, IngestManifest, IngestMetrics, make_source,
+                            save_df_to_local, skip_status, save_fetched, record_fetch,
+                            player_gw_target, understat_targets, print_understat_error,
+                            split_merged_download, local_gameweek_states, incremental_rounds,
+                            gameweek_target, report_missing_gameweek, apply_new_gameweeks,
+                            players_to_fetch, begin_season, season_player_idlist,
+                            finish_season, finish_ingestion, default_store_path, ingest_data)
+
+# A response read in full by AsyncHttpClient.get
+AsyncReply = collections.namedtuple("AsyncReply", ["status", "headers", "body", "retries"])
+
+def _aiohttp():
+    try:
+        import aiohttp
+    except ImportError as e:
+        raise ImportError("Async ingestion requires aiohttp (pip install aiohttp).") from e
+    return aiohttp
+
+class AsyncDownloadScheduler(DownloadScheduler):
+    """
+    DownloadScheduler for coroutines on one event loop: acquire_async()
+    waits for a slot without blocking the loop. The limit, AIMD adaptation
+    (with `adaptive`), rate-limit pauses and status() work as in the
+    threaded scheduler. Share one between concurrent ingest_data_async calls
+    to give them a single download budget.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._changed = asyncio.Event()
+
+    async def acquire_async(self):
+        with self._cond:
+            self.backlog += 1
+        try:
+            while True:
+                with self._cond:
+                    wait = self.paused_until - time.time()
+                    if wait <= 0 and self.in_flight < int(self.limit):
+                        self.in_flight += 1
+                        return
+                self._changed.clear()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=wait if wait > 0 else None)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                self.backlog -= 1
+
+    def release(self, response=None):
+        super().release(response)
+        self._changed.set()
+
+class AsyncHttpClient:
+    """
+    aiohttp counterpart of data_sources.HttpClient: one pooled session whose
+    requests each hold a slot of an AsyncDownloadScheduler, with the same
+    retries and backoff. Use it as an async context manager; counts are in `stats`.
+    """
+    def __init__(self, max_concurrency=8, max_retries=3, backoff_factor=0.5, max_backoff=30.0,
+                 timeout=30, scheduler=None):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.scheduler = scheduler or AsyncDownloadScheduler(max_concurrency)
+        self.max_concurrency = self.scheduler.max_concurrency
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "not_modified": 0}
+        self.session = None
+
+    async def __aenter__(self):
+        aiohttp = _aiohttp()
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    def _retry_delay(self, attempt, reply):
+        delay = random.uniform(0, min(self.max_backoff, self.backoff_factor * (2 ** attempt)))
+        if reply is not None:
+            delay = max(delay, rate_limit_wait(reply))
+        return delay
+
+    async def get(self, url, headers=None, params=None):
+        """
+        GET `url`, retrying transient failures, and return an AsyncReply with
+        the whole body. Raises the last error once retries are exhausted, or
+        OSError for a non-retryable HTTP error.
+        """
+        aiohttp = _aiohttp()
+        attempt = 0
+        while True:
+            self.stats["requests"] += 1
+            reply, error = None, None
+            await self.scheduler.acquire_async()
+            try:
+                async with self.session.get(url, headers=headers, params=params) as response:
+                    # is_throttled/rate_limit_wait expect a requests-style response
+                    reply = SimpleNamespace(status_code=response.status,
+                                            headers=response.headers.copy())
+                    body = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            finally:
+                self.scheduler.release(reply)
+            if (reply is not None and reply.status_code not in RETRY_STATUS_CODES
+                    and not is_throttled(reply)):
+                if reply.status_code == 304:
+                    self.stats["not_modified"] += 1
+                elif reply.status_code >= 400:
+                    self.stats["failures"] += 1
+                    raise OSError("HTTP {} for {}".format(reply.status_code, url))
+                return AsyncReply(reply.status_code, reply.headers, body, attempt)
+            if attempt >= self.max_retries:
+                self.stats["failures"] += 1
+                raise error or OSError("HTTP {} for {}".format(reply.status_code, url))
+            self.stats["retries"] += 1
+            await asyncio.sleep(self._retry_delay(attempt, reply))
+            attempt += 1
+
+class PrefetchedSource(DataSource):
+    """
+    One response already read by AsyncHttpClient, served through the
+    DataSource interface so data_ingestion.fetch_file can compare, parse
+    and save it exactly as it does for synchronous downloads.
+    """
+    def __init__(self, reply):
+        super().__init__()
+        self.reply = reply
+
+    def open(self, relative_path, entry=None, url=None):
+        if self.reply.status == 304:
+            return NOT_MODIFIED
+        return SourceFile(BytesIO(self.reply.body), etag=self.reply.headers.get("ETag"),
+                          last_modified=self.reply.headers.get("Last-Modified"))
+
+    def last_request(self):
+        return {"status": self.reply.status, "retries": self.reply.retries}
+
+class LoopSource(DataSource):
+    """
+    The files of an HttpSource fetched through an AsyncHttpClient running
+    on `loop`, for the data_ingestion helpers run in worker threads that
+    may need a request (e.g. player_gw_columns). Each request holds a slot
+    of the client's scheduler like any other.
+    """
+    def __init__(self, client, source, loop):
+        super().__init__()
+        self.client = client
+        self.source = source
+        self.loop = loop
+
+    def open(self, relative_path, entry=None, url=None):
+        reply = asyncio.run_coroutine_threadsafe(
+            self.client.get(url or self.source.base_url + relative_path,
+                            headers=conditional_headers(entry)), self.loop).result()
+        return PrefetchedSource(reply).open(relative_path)
+
+async def fetch_file_async(client, relative_path, local_path, url, manifest=None, raw=False,
+                           transform=None, journal=None, metrics=None, blob_shas=None):
+    """
+    Async counterpart of data_ingestion.fetch_file for HTTP sources: the
+    journal and blob SHA checks (skip_status) and the conditional GET happen
+    on the event loop, then save_fetched hashes, parses and writes the body
+    in a worker thread. Metrics get the same fetch, parse and write times as
+    fetch_file records. Returns "saved", "unchanged", "skipped" or None on failure.
+    """
+    start = time.perf_counter()
+    timings = {}
+    status = skip_status(relative_path, local_path, manifest, journal, blob_shas)
+    request = None
+    if status is None:
+        entry = None
+        if manifest is not None and os.path.exists(local_path):
+            entry = manifest.get(relative_path)
+        try:
+            reply = await client.get(url, headers=conditional_headers(entry))
+        except Exception as e:
+            print("Error loading '{}': {}".format(relative_path, e))
+            reply = None
+        fetch_time = time.perf_counter() - start
+        if reply is None:
+            request = {"status": None, "retries": 0}
+        else:
+            prefetched = PrefetchedSource(reply)
+            status = await asyncio.to_thread(save_fetched, relative_path, local_path, prefetched,
+                                             manifest, raw, None, transform, journal, blob_shas,
+                                             timings)
+            request = prefetched.last_request()
+        # As in fetch_file, hashing (and a raw file's write) counts as fetch time
+        timings["fetch"] = fetch_time + timings.get("fetch", 0.0)
+    if metrics is not None:
+        record_fetch(metrics, relative_path, status, request, timings, start)
+    return status
+
+async def download_merged_gw_async(client, base_url, base_local_dir, manifest=None, metrics=None,
+                                   compression=None, blob_shas=None):
+    """Async counterpart of data_ingestion.download_merged_gw."""
+    local_path = compressed_path(os.path.join(base_local_dir, "gws", "merged_gw.csv"), compression)
+    result = await fetch_file_async(client, "gws/merged_gw.csv", local_path,
+                                    base_url + "gws/merged_gw.csv", manifest, raw=True,
+                                    metrics=metrics, blob_shas=blob_shas)
+    if result == "saved":
+        return local_path
+    if result == "unchanged":
+        return NOT_MODIFIED
+    print("Falling back to per-gameweek files.")
+    bodies = []
+    while True:
+        try:
+            reply = await client.get(base_url + "gws/gw{}.csv".format(len(bodies) + 1))
+        except Exception:
+            break
+        bodies.append(reply.body)
+    if not bodies:
+        return None
+    print("Found {} gameweek files.".format(len(bodies)))
+
+    def save_merged():
+        gw_dfs = [pd.read_csv(BytesIO(body), encoding='utf-8') for body in bodies]
+        save_df_to_local(pd.concat(gw_dfs, ignore_index=True), local_path)
+    await asyncio.to_thread(save_merged)
+    return local_path
+
+async def fetch_player_gw_async(fetch, source, row, players_local_dir, compression=None):
+    """Async counterpart of data_ingestion.ingest_player_gw; `fetch` as for append_new_gameweeks_async."""
+    relative_path, local_path, transform = player_gw_target(row, players_local_dir, compression)
+    return await fetch(relative_path, local_path, source.base_url + relative_path,
+                       transform=transform)
+
+async def append_new_gameweeks_async(base_local_dir, fetch, source, player_idlist_df,
+                                     players_local_dir, compression=None, blob_shas=None):
+    """
+    Async counterpart of data_ingestion.append_new_gameweeks; `fetch` is a
+    fetch_file_async bound to the run's client, manifest and journal.
+    """
+    states = await asyncio.to_thread(local_gameweek_states, player_idlist_df, players_local_dir)
+    gw_dfs = []
+    if states:
+        first_round, rounds, listed = incremental_rounds(states, blob_shas)
+        for gameweek in rounds:
+            relative_path, local_path = gameweek_target(base_local_dir, gameweek, compression)
+            if await fetch(relative_path, local_path, source.base_url + relative_path,
+                           raw=True) is None:
+                report_missing_gameweek(relative_path, listed)
+                break
+            gw_dfs.append(await asyncio.to_thread(read_local_csv, local_path))
+        print("Checked {} gameweek files from round {}.".format(len(gw_dfs), first_round))
+    results, new_rows = await asyncio.to_thread(apply_new_gameweeks, gw_dfs, states,
+                                                player_idlist_df)
+
+    missing = players_to_fetch(player_idlist_df, states)
+    fetched = await asyncio.gather(*(fetch_player_gw_async(fetch, source, row, players_local_dir,
+                                                           compression)
+                                     for row in missing))
+    results.update(zip((row.name for row in missing), fetched))
+    return [results[index] for index in player_idlist_df.index], new_rows
+
+async def ingest_season_async(base_local_dir, client, source, manifest=None, raw=False, bulk=False,
+                              store=None, season_name=None, store_path=None, resume=True,
+                              metrics=None, compression=None, incremental=False):
+    """
+    Async counterpart of data_ingestion.ingest_season for an HttpSource
+    (only its URLs are used; requests go through `client`). If the task is
+    cancelled, the journal is kept so the next run resumes where it stopped.
+    """
+    journal, metrics = begin_season(base_local_dir, resume, metrics, season_name)
+    try:
+        await _ingest_season_files_async(base_local_dir, client, source, manifest, raw, bulk, store,
+                                         season_name, store_path, journal, metrics, compression,
+                                         incremental)
+    finally:
+        journal.close()
+    # Only reached when the run was neither interrupted nor cancelled
+    journal.clear()
+
+async def _ingest_season_files_async(base_local_dir, client, source, manifest, raw, bulk, store,
+                                     season_name, store_path, journal, metrics, compression,
+                                     incremental=False):
+    """
+    Body of ingest_season_async: data_ingestion.ingest_season_files with
+    the requests made on the event loop and the rest in worker threads.
+    """
+    blob_shas = {}
+    if manifest is not None and source.tree_url is not None:
+        try:
+            reply = await client.get(tree_listing_url(source.tree_url), params={"recursive": "1"})
+            entries = parse_tree_listing(json.loads(reply.body)) or {}
+            blob_shas = {path: entry["sha"] for path, entry in entries.items()}
+        except Exception as e:
+            print("Error listing upstream blob SHAs:", e)
+        if blob_shas:
+            print("Listed {} upstream files.".format(len(blob_shas)))
+    fetch = functools.partial(fetch_file_async, client, manifest=manifest, raw=raw, journal=journal,
+                              metrics=metrics, blob_shas=blob_shas)
+
+    async def fetch_understat_file(relative_path, local_path, url):
+        try:
+            await fetch(relative_path, local_path, url or source.base_url + relative_path)
+        except Exception as e:
+            print_understat_error(relative_path, e)
+
+    async def fetch_understat():
+        try:
+            if source.api_url is None:
+                raise ValueError("No directory listing API configured for {}".format(source.base_url))
+            reply = await client.get(source.api_url.rstrip("/") + "/understat")
+            files = parse_contents_listing(json.loads(reply.body))
+        except Exception as e:
+            print("Error listing Understat files:", e)
+            files = []
+        await asyncio.gather(*(fetch_understat_file(*target) for target in
+                               understat_targets(files, base_local_dir, compression, blob_shas)))
+
+    # Key files and Understat files are independent, so fetch them together
+    await asyncio.gather(
+        *(fetch(file_name, compressed_path(os.path.join(base_local_dir, file_name), compression),
+                source.base_url + file_name)
+          for file_name in KEY_FILES),
+        fetch_understat())
+
+    player_idlist_df = await asyncio.to_thread(season_player_idlist, base_local_dir)
+    if player_idlist_df is None:
+        return
+    players_local_dir = os.path.join(base_local_dir, "players")
+
+    new_rows = None
+    if incremental:
+        results, new_rows = await append_new_gameweeks_async(base_local_dir, fetch, source,
+                                                             player_idlist_df, players_local_dir,
+                                                             compression, blob_shas)
+    elif bulk:
+        if "gws/merged_gw.csv" in journal:
+            results = ["skipped"] * len(player_idlist_df)
+        else:
+            merged_path = await download_merged_gw_async(client, source.base_url, base_local_dir,
+                                                         manifest, metrics, compression, blob_shas)
+            results = await asyncio.to_thread(split_merged_download, merged_path, base_local_dir,
+                                              player_idlist_df, journal, compression,
+                                              LoopSource(client, source, asyncio.get_running_loop()))
+    else:
+        results = list(await asyncio.gather(*(
+            fetch_player_gw_async(fetch, source, row, players_local_dir, compression)
+            for _, row in player_idlist_df.iterrows())))
+    await asyncio.to_thread(finish_season, base_local_dir, results, new_rows, store, store_path,
+                            season_name)
+
+async def ingest_data_async(max_workers=1, max_retries=3, backoff_factor=0.5, use_cache=True,
+                            raw=False, bulk=False, source=None, api_url=None, store=None,
+                            seasons=None, resume=True, adaptive=True, scheduler=None,
+                            metrics_path=None, compression=None, plan=False, incremental=False):
+    """
+    Async counterpart of data_ingestion.ingest_data: the same options, files
+    and returned stats, with every request made on the event loop through one
+    aiohttp session. Cancelling the task stops its requests. `plan` and local
+    or archive sources run ingest_data in a worker thread instead, which
+    cannot be cancelled and does not use `scheduler`.
+
+    scheduler: AsyncDownloadScheduler to use instead of a new one of `max_workers` slots.
+    Other options: see data_ingestion.ingest_data.
+    """
+    if plan or source is not None and not (
+            isinstance(source, str) and source.startswith(("http://", "https://"))):
+        if isinstance(scheduler, AsyncDownloadScheduler):
+            print("Planning and local sources run in a worker thread; `scheduler` is not used.")
+        return await asyncio.to_thread(
+            ingest_data, max_workers=max_workers, max_retries=max_retries,
+            backoff_factor=backoff_factor, use_cache=use_cache, raw=raw, bulk=bulk, source=source,
+            api_url=api_url, store=store, seasons=seasons, resume=resume, adaptive=adaptive,
+            scheduler=None if isinstance(scheduler, AsyncDownloadScheduler) else scheduler,
+            metrics_path=metrics_path, compression=compression, plan=plan, incremental=incremental)
+    if scheduler is not None and not isinstance(scheduler, AsyncDownloadScheduler):
+        raise TypeError("ingest_data_async needs an AsyncDownloadScheduler, not {}".format(
+            type(scheduler).__name__))
+
+    base_local_dir = "data"
+    os.makedirs(base_local_dir, exist_ok=True)
+    metrics = IngestMetrics()
+
+    async def run_season(season_dir, season_source, season_name=None, store_path=None):
+        manifest = IngestManifest(os.path.join(season_dir, MANIFEST_FILE)) if use_cache else None
+        try:
+            await ingest_season_async(season_dir, client, season_source, manifest, raw, bulk, store,
+                                      season_name, store_path, resume, metrics, compression,
+                                      incremental)
+        finally:
+            if manifest is not None:
+                manifest.save()
+
+    scheduler = scheduler or AsyncDownloadScheduler(max_workers, adaptive=adaptive)
+    async with AsyncHttpClient(max_workers, max_retries, backoff_factor, scheduler=scheduler) as client:
+        if not seasons:
+            await run_season(base_local_dir, make_source(source, api_url=api_url))
+        else:
+            await asyncio.gather(*(
+                run_season(os.path.join(base_local_dir, season_name),
+                           make_source(source, season=season_name, api_url=api_url), season_name,
+                           default_store_path(base_local_dir, store))
+                for season_name in seasons))
+
+    return finish_ingestion(base_local_dir, client.stats, scheduler, metrics, max_workers,
+                            metrics_path)
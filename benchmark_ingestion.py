@@ -0,0 +1,148 @@
+import os
+import io
+import time
+import argparse
+import tempfile
+import contextlib
+import pandas as pd
+from stub_server import StubFPLServer
+from data_ingestion import ingest_data
+
+def run_ingestion(stub, season, max_workers, raw=False, bulk=False):
+    """
+    Runs one cold ingest_data() against `stub` in a fresh temporary working
+    directory (ingest_data writes to a relative data/ directory) with its
+    output suppressed. Returns the stats dict plus wall time and the number
+    of requests the server saw.
+    """
+    cwd = os.getcwd()
+    requests_before = stub.requests
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats = ingest_data(max_workers=max_workers, use_cache=False, raw=raw, bulk=bulk,
+                                    source=stub.raw_url + season, api_url=stub.api_url + season)
+            wall_time = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+    return dict(stats, wall_time=wall_time, server_requests=stub.requests - requests_before)
+
+def ingested_player_files(stub, season, bulk=False):
+    """
+    Bytes of every players/<folder>/gw.csv a cold ingest_data() against
+    `stub` writes (per player, or with `bulk` split from merged_gw.csv),
+    keyed by path relative to the players directory.
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                ingest_data(use_cache=False, bulk=bulk, source=stub.raw_url + season,
+                            api_url=stub.api_url + season)
+            players_dir = os.path.join("data", "players")
+            files = {}
+            for folder in sorted(os.listdir(players_dir)):
+                with open(os.path.join(players_dir, folder, "gw.csv"), "rb") as f:
+                    files[folder + "/gw.csv"] = f.read()
+        finally:
+            os.chdir(cwd)
+    return files
+
+def verify_bulk(n_players=50, season="2024-25"):
+    """
+    Checks that bulk ingestion writes byte-identical per-player files to
+    the per-player download. Returns the paths that differ or exist in
+    only one of them.
+    """
+    with StubFPLServer(n_players, [season]) as stub:
+        per_player = ingested_player_files(stub, season)
+        bulk = ingested_player_files(stub, season, bulk=True)
+    return sorted(path for path in set(per_player) | set(bulk) if per_player.get(path) != bulk.get(path))
+
+def verify_concurrency(max_workers=4, seasons=("2022-23", "2023-24", "2024-25"), n_players=40,
+                       latency=0.01, body_latency=0.05):
+    """
+    Ingests several seasons at once from a stub server that delays every
+    body after its headers, and returns the most requests the server saw in
+    flight, body transfers included. With the seasons sharing one download
+    budget this must not exceed `max_workers`.
+    """
+    cwd = os.getcwd()
+    with StubFPLServer(n_players, seasons, latency=latency, body_latency=body_latency) as stub, \
+            tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                ingest_data(max_workers=max_workers, use_cache=False, seasons=list(seasons),
+                            source=stub.raw_url, api_url=stub.api_url, adaptive=False)
+        finally:
+            os.chdir(cwd)
+        return stub.max_active
+
+def benchmark(player_counts, worker_counts, latency=0.05, error_rate=0.0, max_concurrency=None,
+              raw=False, bulk=False, season="2024-25"):
+    """
+    Ingests a synthetic season of each size in `player_counts` from a local
+    stub server once per entry in `worker_counts`, and returns one row of
+    wall time, requests/s and fetch latency percentiles per run.
+    """
+    results = []
+    for n_players in player_counts:
+        with StubFPLServer(n_players, [season], latency=latency, error_rate=error_rate,
+                           max_concurrency=max_concurrency) as stub:
+            for max_workers in worker_counts:
+                stats = run_ingestion(stub, season, max_workers, raw, bulk)
+                results.append({
+                    "players": n_players,
+                    "workers": max_workers,
+                    "wall_time": round(stats["wall_time"], 2),
+                    "requests": stats["server_requests"],
+                    "req_per_s": round(stats["server_requests"] / stats["wall_time"], 1),
+                    "retries": stats["retries"],
+                    "failures": stats["failures"],
+                    "p50": round(stats["metrics"]["latency_p50"], 3),
+                    "p95": round(stats["metrics"]["latency_p95"], 3),
+                    "final_limit": stats["scheduler"]["limit"],
+                })
+                print("{players} players, {workers} workers: {wall_time}s, {requests} requests "
+                      "({req_per_s}/s), p50 {p50}s, p95 {p95}s".format(**results[-1]))
+    return pd.DataFrame(results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark data ingestion against a local stub server.")
+    parser.add_argument("--players", type=int, nargs="+", default=[100, 700, 5000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="Mean simulated response delay in seconds (default: 0.05).")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests failing with 503.")
+    parser.add_argument("--max-concurrency", type=int, default=None,
+                        help="Server answers 429 beyond this many requests in flight.")
+    parser.add_argument("--raw", action="store_true", help="Benchmark raw passthrough ingestion.")
+    parser.add_argument("--bulk", action="store_true", help="Benchmark bulk (merged gameweek) ingestion.")
+    parser.add_argument("--output", default=None, help="Also save the results table to this CSV file.")
+    parser.add_argument("--verify-bulk", action="store_true",
+                        help="Only check that --bulk writes the same player files as per-player ingestion.")
+    parser.add_argument("--verify-concurrency", action="store_true",
+                        help="Only check that a multi-season run keeps at most --workers requests, "
+                             "bodies included, in flight.")
+    args = parser.parse_args()
+    if args.verify_concurrency:
+        max_workers = args.workers[-1]
+        in_flight = verify_concurrency(max_workers)
+        print("At most {} requests in flight with --workers {}.".format(in_flight, max_workers))
+        raise SystemExit(1 if in_flight > max_workers else 0)
+    if args.verify_bulk:
+        mismatches = verify_bulk(args.players[0])
+        print("Bulk and per-player files {}.".format(
+            "differ: " + ", ".join(mismatches[:10]) if mismatches else "are identical"))
+        raise SystemExit(1 if mismatches else 0)
+    results = benchmark(args.players, args.workers, args.latency, args.error_rate,
+                        args.max_concurrency, args.raw, args.bulk)
+    print()
+    print(results.to_string(index=False))
+    if args.output:
+        results.to_csv(args.output, index=False)
@@ -0,0 +1,72 @@
+import os
+import io
+import time
+import argparse
+import tempfile
+import contextlib
+import pandas as pd
+from data_store import compressed_path, load_player_gw_dir, schema_for, FILE_SCHEMAS
+from data_ingestion import save_df_to_local
+from benchmark_storage import synthetic_player_files
+
+def benchmark(players_dir, worker_counts, chunk_sizes=(64,), repeats=3):
+    """
+    Times load_player_gw_dir on `players_dir` serially and with each process
+    pool size in `worker_counts` (per batch size in `chunk_sizes`), with the
+    player gameweek schema dtypes. Every parallel result is checked against
+    the serial DataFrame. Returns one row per run: best and first wall time,
+    rows/s and the speedup over the serial read.
+    """
+    schema = schema_for("players/*/gw.csv", FILE_SCHEMAS)
+    serial_df = None
+    results = []
+    runs = [(1, None)] + [(workers, chunk_size) for workers in worker_counts if workers > 1
+                          for chunk_size in chunk_sizes]
+    for workers, chunk_size in runs:
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            player_gw_df = load_player_gw_dir(players_dir, schema, workers=workers,
+                                              chunk_size=chunk_size or 64)
+            times.append(time.perf_counter() - start)
+        if serial_df is None:
+            serial_df = player_gw_df
+        else:
+            pd.testing.assert_frame_equal(player_gw_df, serial_df)
+        results.append({
+            "workers": workers,
+            "chunk_size": chunk_size or "-",
+            "rows": len(player_gw_df),
+            "first_s": round(times[0], 3),
+            "best_s": round(min(times), 3),
+            "rows_per_s": int(len(player_gw_df) / min(times)),
+        })
+    results = pd.DataFrame(results)
+    results["speedup"] = (results["best_s"].iloc[0] / results["best_s"]).round(2)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare serial and process pool loading of player gw.csv files.")
+    parser.add_argument("--players", type=int, default=700,
+                        help="Size of the synthetic season (ignored with --players-dir).")
+    parser.add_argument("--players-dir", default=None,
+                        help="Benchmark an ingested players directory instead.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8, 16])
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[16, 64])
+    parser.add_argument("--compress", choices=["gzip", "zstd"], default=None,
+                        help="Codec of the synthetic files.")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    if args.players_dir:
+        results = benchmark(args.players_dir, args.workers, args.chunk_sizes, args.repeats)
+    else:
+        with tempfile.TemporaryDirectory() as work_dir:
+            players_dir = os.path.join(work_dir, "players")
+            with contextlib.redirect_stdout(io.StringIO()):
+                for folder, df in synthetic_player_files(args.players).items():
+                    save_df_to_local(df, compressed_path(os.path.join(players_dir, folder, "gw.csv"),
+                                                         args.compress))
+            results = benchmark(players_dir, args.workers, args.chunk_sizes, args.repeats)
+    print()
+    print(results.to_string(index=False))
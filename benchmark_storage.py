@@ -0,0 +1,108 @@
+import os
+import io
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+import pandas as pd
+from stub_server import build_season_tree
+from data_store import compressed_path, load_player_gw_dir, read_local_csv, _zstandard
+from data_ingestion import save_df_to_local
+
+def directory_size(path):
+    """Total size in bytes of the files under `path`."""
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+def synthetic_player_files(n_players, gameweeks=38):
+    """Per-player gameweek DataFrames of a synthetic season, keyed by player folder name."""
+    tree = build_season_tree(n_players, gameweeks)
+    return {path.split("/")[1]: pd.read_csv(io.BytesIO(content))
+            for path, content in tree.items() if path.startswith("players/")}
+
+def local_player_files(players_dir):
+    """Per-player gameweek DataFrames of an ingested players directory, keyed by folder name."""
+    player_files = {}
+    for folder in os.listdir(players_dir):
+        df = read_local_csv(os.path.join(players_dir, folder, "gw.csv"))
+        if df is not None:
+            player_files[folder] = df
+    return player_files
+
+def available_codecs(codecs):
+    """`codecs` without those whose compression module is not installed, with a note for each."""
+    available = []
+    for codec in codecs:
+        if codec == "zstd":
+            try:
+                _zstandard()
+            except ImportError as e:
+                print("Skipping zstd: {}".format(e))
+                continue
+        available.append(codec)
+    return available
+
+def benchmark(player_files, work_dir, codecs=(None, "gzip", "zstd"), repeats=3):
+    """
+    Saves `player_files` as a players directory under `work_dir` with each
+    codec in `codecs` and times reading it back with load_player_gw_dir.
+    Returns one row per codec: size on disk, write time and read time and
+    throughput (first read and best of `repeats`), and the size ratio
+    against the first codec. Codecs that cannot be used here are skipped.
+    """
+    results = []
+    for codec in available_codecs(codecs):
+        players_dir = os.path.join(work_dir, "players_{}".format(codec or "csv"))
+        if os.path.exists(players_dir):
+            shutil.rmtree(players_dir)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for folder, df in player_files.items():
+                save_df_to_local(df, compressed_path(os.path.join(players_dir, folder, "gw.csv"),
+                                                     codec))
+        write_time = time.perf_counter() - start
+        size = directory_size(players_dir)
+        read_times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            player_gw_df = load_player_gw_dir(players_dir)
+            read_times.append(time.perf_counter() - start)
+        results.append({
+            "codec": codec or "none",
+            "files": len(player_files),
+            "rows": len(player_gw_df),
+            "size_mb": round(size / 1e6, 2),
+            "write_s": round(write_time, 2),
+            "first_read_s": round(read_times[0], 3),
+            "best_read_s": round(min(read_times), 3),
+            "read_mb_per_s": round(size / 1e6 / min(read_times), 1),
+            "rows_per_s": int(len(player_gw_df) / min(read_times)),
+        })
+        shutil.rmtree(players_dir)
+    results = pd.DataFrame(results)
+    results["ratio"] = (results["size_mb"].iloc[0] / results["size_mb"]).round(2)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare on-disk size and read throughput of plain and compressed player files.")
+    parser.add_argument("--players", type=int, default=700,
+                        help="Size of the synthetic season (ignored with --players-dir).")
+    parser.add_argument("--players-dir", default=None,
+                        help="Benchmark the gw.csv files of an ingested players directory instead.")
+    parser.add_argument("--dir", default=None,
+                        help="Directory to write the test files in, e.g. on the shared volume "
+                             "(default: a temporary directory).")
+    parser.add_argument("--codecs", nargs="+", default=["none", "gzip", "zstd"])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    if args.players_dir:
+        player_files = local_player_files(args.players_dir)
+    else:
+        player_files = synthetic_player_files(args.players)
+    codecs = [None if codec == "none" else codec for codec in args.codecs]
+    with tempfile.TemporaryDirectory(dir=args.dir) as work_dir:
+        results = benchmark(player_files, work_dir, codecs, args.repeats)
+    print()
+    print(results.to_string(index=False))
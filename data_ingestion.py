@@ -1,102 +1,1395 @@
 import os
+import re
+import copy
+import json
+import time
+import shutil
+import fnmatch
+import hashlib
+import argparse
+import itertools
+import threading
+import numpy as np
 import pandas as pd
-import requests
-from io import StringIO
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from data_sources import (NOT_MODIFIED, HttpClient, DataSource, DownloadScheduler, HttpSource,
+                          LocalDirectorySource, ArchiveSource, get_default_client)
+from data_store import (load_player_gw_dir, write_player_gw_store, compressed_path, path_compression,
+                        open_compressed_writer, remove_other_variants, read_local_csv, CSV_COMPRESSION,
+                        resolve_csv_path, schema_for, validate_schema, write_schema, load_schema,
+                        append_player_gw_store, load_player_gw_file, apply_schema,
+                        write_sqlite_store, append_sqlite_player_gw, sqlite_store_seasons)
+
+# Season ingested by default
+season = "2024-25"
+
+# Raw file and GitHub contents API URLs for a season's data directory
+RAW_URL_TEMPLATE = "https://raw.githubusercontent.com/vaastav/Fantasy-Premier-League/master/data/{season}/"
+API_URL_TEMPLATE = "https://api.github.com/repos/vaastav/Fantasy-Premier-League/contents/data/{season}/"
 
 # Base URL for raw files from GitHub
-raw_base_url = "https://raw.githubusercontent.com/vaastav/Fantasy-Premier-League/master/data/2024-25/"
+raw_base_url = RAW_URL_TEMPLATE.format(season=season)
+
+# GitHub contents API for the same directory, used to list the Understat files
+api_base_url = API_URL_TEMPLATE.format(season=season)
+
+# Name of the conditional-GET manifest kept in the local data directory
+MANIFEST_FILE = "manifest.json"
+
+# Name of the journal of finished files kept while an ingestion is in progress
+JOURNAL_FILE = "ingest_journal.txt"
+
+# Throughput of recent ingestion runs, kept in the data directory to estimate planned runs
+HISTORY_FILE = "ingest_history.json"
+
+# Files fetched from the root of every season data directory
+KEY_FILES = ["teams.csv", "fixtures.csv", "player_idlist.csv", "players_raw.csv"]
+
+# Columns present in gws/merged_gw.csv but not in the per-player gw.csv files
+MERGED_GW_ONLY_COLUMNS = ["name", "position", "team", "xP", "GW"]
+
+class IngestManifest:
+    """
+    On-disk record of the ETag, Last-Modified, SHA-256 content hash and
+    listed git blob SHA of every remote file downloaded, keyed by relative
+    path, for conditional requests on later runs. New validators stay pending
+    until commit(), once the local copy has been written.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.pending = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print("Ignoring unreadable manifest '{}': {}".format(path, e))
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self.entries.get(key)
+
+    def record(self, key, source_file, content_hash):
+        with self._lock:
+            self.pending[key] = {
+                "etag": source_file.etag,
+                "last_modified": source_file.last_modified,
+                "sha256": content_hash,
+            }
+
+    def commit(self, key):
+        with self._lock:
+            if key in self.pending:
+                self.entries[key] = self.pending.pop(key)
+
+    def record_blob_sha(self, key, blob_sha):
+        """Attach the upstream git blob SHA to a committed entry."""
+        with self._lock:
+            if key in self.entries:
+                self.entries[key]["blob_sha"] = blob_sha
+
+    def save(self):
+        """Write the manifest atomically so an interrupted run never leaves it truncated."""
+        with self._lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+class IngestJournal:
+    """
+    Append-only list of the relative paths an ingestion run has finished,
+    flushed after every file so it survives the process being killed. A run
+    that finds a journal left behind skips those paths; a run that completes
+    removes it.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.done = {line.rstrip("\n") for line in f if line.strip()}
+        self.resumed = bool(self.done)
+        self._file = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, relative_path):
+        return relative_path in self.done
+
+    def mark(self, relative_path):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding='utf-8')
+            self._file.write(relative_path + "\n")
+            self._file.flush()
+            self.done.add(relative_path)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def clear(self):
+        """Forget all finished paths and remove the journal file."""
+        self.close()
+        self.done = set()
+        if os.path.exists(self.path):
+            os.remove(self.path)
 
-def load_csv_from_url(relative_path):
+class IngestMetrics:
     """
-    Given a relative path, construct the raw URL, download the CSV,
-    and load it into a DataFrame using UTF-8 encoding.
+    Per-file fetch records for an ingestion run (wall time, bytes, HTTP
+    status, retries, parse and write time), safe to record from many
+    threads. summary() aggregates them into latency percentiles,
+    throughput and the slowest files.
     """
-    url = raw_base_url + relative_path
+    def __init__(self):
+        self.records = []
+        self.tags = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def tagged(self, **tags):
+        """A view that adds `tags` (e.g. season) to every record and shares this object's records."""
+        view = copy.copy(self)
+        view.tags = dict(self.tags, **tags)
+        return view
+
+    def record(self, **fields):
+        with self._lock:
+            self.records.append(dict(self.tags, **fields))
+
+    def summary(self, slowest=10):
+        with self._lock:
+            records = list(self.records)
+        elapsed = time.time() - self.started
+        total_bytes = sum(r["bytes"] for r in records)
+        fetched = [r for r in records if r["requested"]]
+        latencies = np.array([r["fetch_time"] for r in fetched]) if fetched else np.zeros(1)
+        by_status = {}
+        for r in fetched:
+            by_status[str(r["status"])] = by_status.get(str(r["status"]), 0) + 1
+        return {
+            "files": len(records),
+            "fetched": len(fetched),
+            "bytes": total_bytes,
+            "elapsed": elapsed,
+            "mb_per_s": total_bytes / 1e6 / elapsed if elapsed > 0 else 0.0,
+            "files_per_s": len(fetched) / elapsed if elapsed > 0 else 0.0,
+            "latency_p50": float(np.percentile(latencies, 50)),
+            "latency_p95": float(np.percentile(latencies, 95)),
+            "latency_max": float(latencies.max()),
+            "parse_time": sum(r["parse_time"] for r in records),
+            "write_time": sum(r["write_time"] for r in records),
+            "retries": sum(r["retries"] for r in records),
+            "by_status": by_status,
+            "slowest": sorted(fetched, key=lambda r: r["wall_time"], reverse=True)[:slowest],
+        }
+
+    def write_json(self, path):
+        """Write the summary and every per-file record to `path` as JSON."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding='utf-8') as f:
+            json.dump({"summary": self.summary(), "files": self.records}, f, indent=1)
+        print("Saved ingestion metrics to", path)
+
+def load_ingest_history(path):
+    """The runs recorded by record_ingest_history at `path`, oldest first ([] if none)."""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print("Ignoring unreadable ingestion history '{}': {}".format(path, e))
+        return []
+
+def record_ingest_history(path, summary, max_workers, keep=20):
+    """
+    Append the request count, bytes and elapsed time of a run (an
+    IngestMetrics summary) to the history at `path`, keeping the last
+    `keep` runs. Runs that requested nothing say nothing about throughput
+    and are not recorded.
+    """
+    if not summary["fetched"]:
+        return
+    history = load_ingest_history(path)
+    history.append({"time": time.time(), "workers": max_workers, "requests": summary["fetched"],
+                    "bytes": summary["bytes"], "elapsed": summary["elapsed"]})
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding='utf-8') as f:
+        json.dump(history[-keep:], f, indent=1)
+    os.replace(tmp_path, path)
+
+def estimate_duration(requests, n_bytes, history, max_workers, recent=5):
+    """
+    Seconds that `requests` fetches totalling `n_bytes` should take at the
+    throughput of the last `recent` runs in `history` with the same
+    `max_workers` (or any recent runs), or at the best recent byte rate if
+    that is slower. None without history.
+    """
+    runs = [run for run in history if run["workers"] == max_workers] or history
+    runs = runs[-recent:]
+    if not runs:
+        return None
+    elapsed = sum(run["elapsed"] for run in runs)
+    estimate = requests * elapsed / max(1, sum(run["requests"] for run in runs))
+    bytes_per_s = max([run["bytes"] / run["elapsed"] for run in history[-recent:]
+                       if run["elapsed"] > 0] or [0])
+    if bytes_per_s:
+        estimate = max(estimate, n_bytes / bytes_per_s)
+    return estimate
+
+def make_source(source=None, client=None, season=None, api_url=None):
+    """
+    Resolve `source` into a DataSource: None for GitHub, an HTTP(S) base URL
+    (with `api_url` for its listing API off GitHub), a local mirror directory
+    or a .zip/.tar archive. With `season`, strings name the parent "data"
+    directory. DataSource instances are returned unchanged.
+    """
+    if isinstance(source, DataSource):
+        if season is not None:
+            raise ValueError("Pass a URL or path, not a DataSource, to ingest several seasons.")
+        return source
+    client = client or get_default_client()
+    if source is None:
+        if season is None:
+            return HttpSource(raw_base_url, api_base_url, client)
+        return HttpSource(RAW_URL_TEMPLATE.format(season=season),
+                          API_URL_TEMPLATE.format(season=season), client)
+    if source.startswith(("http://", "https://")):
+        if season is not None:
+            source = source.rstrip("/") + "/" + season + "/"
+            if api_url:
+                api_url = api_url.rstrip("/") + "/" + season + "/"
+        return HttpSource(source, api_url, client=client)
+    if os.path.isdir(source):
+        return LocalDirectorySource(os.path.join(source, season) if season else source)
+    if os.path.isfile(source):
+        return ArchiveSource(source, season=season)
+    raise ValueError("Unknown data source: {}".format(source))
+
+def load_csv_from_url(relative_path, source=None, manifest=None, local_path=None, url=None,
+                      timings=None):
+    """
+    Given a relative path, read the CSV from the data source and load it into
+    a DataFrame using UTF-8 encoding. With a manifest and an existing
+    `local_path` the fetch is conditional, and NOT_MODIFIED is returned for an
+    unchanged file. Fetch/parse times and bytes go into `timings` if given.
+    """
+    source = make_source(source)
+    timings = timings if timings is not None else {}
+    start = time.perf_counter()
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        response.encoding = 'utf-8'
-        df = pd.read_csv(StringIO(response.text), encoding='utf-8')
+        entry = None
+        if manifest is not None and local_path and os.path.exists(local_path):
+            entry = manifest.get(relative_path)
+        source_file = source.open(relative_path, entry, url)
+        if source_file is NOT_MODIFIED:
+            timings["fetch"] = time.perf_counter() - start
+            print("Unchanged '{}' (not modified)".format(relative_path))
+            return NOT_MODIFIED
+        with source_file:
+            content = source_file.read()
+        timings["fetch"] = time.perf_counter() - start
+        timings["bytes"] = len(content)
+        content_hash = hashlib.sha256(content).hexdigest()
+        if manifest is not None:
+            manifest.record(relative_path, source_file, content_hash)
+        if entry and entry.get("sha256") == content_hash:
+            manifest.commit(relative_path)
+            print("Unchanged '{}' (same content hash)".format(relative_path))
+            return NOT_MODIFIED
+        parse_start = time.perf_counter()
+        df = pd.read_csv(BytesIO(content), encoding='utf-8')
+        timings["parse"] = time.perf_counter() - parse_start
         print("Loaded '{}' with shape {}".format(relative_path, df.shape))
         return df
     except Exception as e:
+        timings.setdefault("fetch", time.perf_counter() - start)
         print("Error loading '{}': {}".format(relative_path, e))
         return None
 
+def download_to_local(relative_path, local_path, source=None, manifest=None, url=None,
+                      timings=None):
+    """
+    Stream a file's bytes from the data source to `local_path` (compressed
+    for a .gz/.zst path) without parsing it, via a temporary file renamed into
+    place. Conditional as in load_csv_from_url. Returns local_path,
+    NOT_MODIFIED, or None on failure.
+    """
+    source = make_source(source)
+    timings = timings if timings is not None else {}
+    start = time.perf_counter()
+    tmp_path = None
+    try:
+        entry = None
+        if manifest is not None and os.path.exists(local_path):
+            entry = manifest.get(relative_path)
+        source_file = source.open(relative_path, entry, url)
+        if source_file is NOT_MODIFIED:
+            timings["fetch"] = time.perf_counter() - start
+            print("Unchanged '{}' (not modified)".format(relative_path))
+            return NOT_MODIFIED
+        with source_file:
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            tmp_path = "{}.{}.tmp".format(local_path, threading.get_ident())
+            digest = hashlib.sha256()
+            size = 0
+            with open_compressed_writer(tmp_path, path_compression(local_path)) as f:
+                for chunk in source_file.iter_chunks():
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+        timings["fetch"] = time.perf_counter() - start
+        timings["bytes"] = size
+        content_hash = digest.hexdigest()
+        if manifest is not None:
+            manifest.record(relative_path, source_file, content_hash)
+        if entry and entry.get("sha256") == content_hash:
+            os.remove(tmp_path)
+            manifest.commit(relative_path)
+            print("Unchanged '{}' (same content hash)".format(relative_path))
+            return NOT_MODIFIED
+        os.replace(tmp_path, local_path)
+        remove_other_variants(local_path)
+        if manifest is not None:
+            manifest.commit(relative_path)
+        print("Saved file to", local_path)
+        return local_path
+    except Exception as e:
+        timings.setdefault("fetch", time.perf_counter() - start)
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        print("Error downloading '{}': {}".format(relative_path, e))
+        return None
+
 def save_df_to_local(df, local_path):
-    """Save DataFrame to a local CSV file, creating directories if necessary."""
+    """
+    Save DataFrame to a local CSV file, creating directories if necessary.
+    The CSV is written to a temporary file and renamed into place, so a
+    half-written file is never left at `local_path`. A `local_path` ending in
+    .gz or .zst is compressed (see data_store.CSV_COMPRESSION), and copies
+    saved earlier under another codec are removed.
+    """
+    compression = path_compression(local_path)
     os.makedirs(os.path.dirname(local_path), exist_ok=True)
-    df.to_csv(local_path, index=False, encoding='utf-8')
+    tmp_path = "{}.{}.tmp".format(local_path, threading.get_ident())
+    try:
+        if compression:
+            with open_compressed_writer(tmp_path, compression) as f:
+                f.write(df.to_csv(index=False).encode('utf-8'))
+        else:
+            df.to_csv(tmp_path, index=False, encoding='utf-8')
+        os.replace(tmp_path, local_path)
+        remove_other_variants(local_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
     print("Saved file to", local_path)
 
-def ingest_data():
+def append_df_to_local(df, local_path):
     """
-    Downloads required data files from GitHub and saves them locally.
-    This includes key files, Understat data, and all players' gameweek data.
+    Append the rows of `df` to the CSV at `local_path`, in that file's
+    column order. The file is rewritten through a synced temporary copy that
+    replaces it, so it is never left half-appended.
     """
-    base_local_dir = "data"
-    os.makedirs(base_local_dir, exist_ok=True)
+    columns = pd.read_csv(local_path, nrows=0, encoding='utf-8').columns
+    df = df.reindex(columns=columns)
+    if path_compression(local_path):
+        existing_df = pd.read_csv(local_path, encoding='utf-8')
+        save_df_to_local(pd.concat([existing_df, df], ignore_index=True), local_path)
+        return
+    content = df.to_csv(index=False, header=False).encode('utf-8')
+    tmp_path = "{}.{}.tmp".format(local_path, threading.get_ident())
+    try:
+        shutil.copyfile(local_path, tmp_path)
+        with open(tmp_path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    content = b"\n" + content
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, local_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    print("Appended {} rows to {}".format(len(df), local_path))
 
-    # --- Download key files from the root of the data directory ---
-    key_files = ["teams.csv", "fixtures.csv", "player_idlist.csv", "players_raw.csv"]
-    for file_name in key_files:
-        df = load_csv_from_url(file_name)
-        if df is not None:
-            local_path = os.path.join(base_local_dir, file_name)
-            save_df_to_local(df, local_path)
-
-    # --- Ingest Understat files using the GitHub API ---
+def player_folder_name(row):
+    """Folder name used upstream for a player_idlist row: "FirstName_SecondName_ID"."""
+    return f"{row['first_name']}_{row['second_name']}_{int(row['id'])}"
+
+def add_player_columns(df, player_id):
+    """Add the player_id column and, if missing, a gameweek column numbered by row order."""
+    df['player_id'] = player_id
+    # If a gameweek column is missing, add one (assumes row order reflects gameweeks)
+    if 'gameweek' not in df.columns:
+        df = df.reset_index().rename(columns={'index': 'gameweek'})
+        df['gameweek'] = df['gameweek'] + 1
+    return df
+
+def fetch_file(relative_path, local_path, source=None, manifest=None, raw=False, url=None,
+               transform=None, journal=None, metrics=None, blob_shas=None, timings=None):
+    """
+    Fetch one file into `local_path`: parsed, checked against its schema and
+    re-written as CSV (after `transform`), or with `raw` streamed as-is.
+    Journaled paths and files whose listed blob SHA is unchanged are not
+    requested. Returns "saved", "unchanged", "skipped" or None on failure;
+    timings go into `metrics` and `timings` if given.
+    """
+    source = make_source(source)
+    start = time.perf_counter()
+    timings = timings if timings is not None else {}
+    status = skip_status(relative_path, local_path, manifest, journal, blob_shas)
+    request = None
+    if status is None:
+        status = save_fetched(relative_path, local_path, source, manifest, raw, url, transform,
+                              journal, blob_shas, timings)
+        request = source.last_request()
+    if metrics is not None:
+        record_fetch(metrics, relative_path, status, request, timings, start)
+    return status
+
+def skip_status(relative_path, local_path, manifest=None, journal=None, blob_shas=None):
+    """
+    "skipped" if `journal` has the path, "unchanged" (and journaled) if its
+    listed blob SHA matches the manifest and the local copy exists, or None
+    if the file has to be requested.
+    """
+    if journal is not None and relative_path in journal:
+        return "skipped"
+    blob_sha = blob_shas.get(relative_path) if blob_shas else None
+    entry = manifest.get(relative_path) if manifest is not None and blob_sha else None
+    if entry and entry.get("blob_sha") == blob_sha and os.path.exists(local_path):
+        print("Unchanged '{}' (same blob SHA)".format(relative_path))
+        if journal is not None:
+            journal.mark(relative_path)
+        return "unchanged"
+    return None
+
+def save_fetched(relative_path, local_path, source, manifest=None, raw=False, url=None,
+                 transform=None, journal=None, blob_shas=None, timings=None):
+    """
+    The request and save half of fetch_file, without its journal and blob
+    SHA checks (see skip_status). Returns "saved", "unchanged" or None.
+    """
+    timings = timings if timings is not None else {}
+    if raw:
+        result = download_to_local(relative_path, local_path, source, manifest, url, timings)
+    else:
+        result = load_csv_from_url(relative_path, source, manifest, local_path, url, timings)
+        if result is not None and result is not NOT_MODIFIED:
+            schema = schema_for(relative_path)
+            problems = validate_schema(result, schema) if schema else []
+            if problems:
+                print("Schema mismatch in '{}': {}".format(relative_path, "; ".join(problems)))
+            write_start = time.perf_counter()
+            save_df_to_local(transform(result) if transform else result, local_path)
+            timings["write"] = time.perf_counter() - write_start
+            if manifest is not None:
+                manifest.commit(relative_path)
+    if result is None:
+        return None
+    blob_sha = blob_shas.get(relative_path) if blob_shas else None
+    if manifest is not None and blob_sha:
+        manifest.record_blob_sha(relative_path, blob_sha)
+    if journal is not None:
+        journal.mark(relative_path)
+    return "unchanged" if result is NOT_MODIFIED else "saved"
+
+def record_fetch(metrics, relative_path, status, request, timings, start):
+    """Add a fetch_file record to `metrics`; `request` is the last_request() dict, None if none was made."""
+    metrics.record(path=relative_path, result=status or "failed", requested=request is not None,
+                   status=request["status"] if request else None,
+                   retries=request["retries"] if request else 0, bytes=timings.get("bytes", 0),
+                   fetch_time=timings.get("fetch", 0.0), parse_time=timings.get("parse", 0.0),
+                   write_time=timings.get("write", 0.0), wall_time=time.perf_counter() - start)
+
+def ingest_player_gw(row, players_local_dir, source=None, manifest=None, raw=False, journal=None,
+                     metrics=None, compression=None, blob_shas=None):
+    """
+    Download a single player's gameweek file to
+    <players_local_dir>/<FirstName_SecondName_ID>/gw.csv, adding the
+    player_id and gameweek columns unless `raw`. Returns "saved",
+    "unchanged", "skipped" or None if the download failed.
+    """
+    relative_path, local_file_path, transform = player_gw_target(row, players_local_dir, compression)
+    return fetch_file(relative_path, local_file_path, source, manifest, raw, transform=transform,
+                      journal=journal, metrics=metrics, blob_shas=blob_shas)
+
+def player_gw_target(row, players_local_dir, compression=None):
+    """
+    Relative path, local path and add_player_columns transform of the
+    gw.csv of a player_idlist row, saved preserving the upstream folder
+    structure: <players_local_dir>/<FirstName_SecondName_ID>/gw.csv.
+    """
+    folder_name = player_folder_name(row)
+    local_path = compressed_path(os.path.join(players_local_dir, folder_name, "gw.csv"), compression)
+    return (f"players/{folder_name}/gw.csv", local_path,
+            lambda df: add_player_columns(df, row['id']))
+
+def understat_targets(files, base_local_dir, compression=None, blob_shas=None):
+    """
+    Relative path, local path and download URL of every CSV file in an
+    Understat directory listing (see DataSource.list_dir). Listed blob SHAs
+    are added to `blob_shas`.
+    """
     understat_local_dir = os.path.join(base_local_dir, "understat")
     os.makedirs(understat_local_dir, exist_ok=True)
-    api_url = "https://api.github.com/repos/vaastav/Fantasy-Premier-League/contents/data/2024-25/understat"
-    try:
-        response = requests.get(api_url)
-        response.raise_for_status()
-    except Exception as e:
-        print("Error accessing GitHub API for Understat files:", e)
-        return
-    files = response.json()
+    targets = []
     for file in files:
         if file.get('type') == 'file' and file.get('name', '').endswith('.csv'):
             name = file.get('name')
-            download_url = file.get('download_url')
-            try:
-                df = pd.read_csv(download_url, encoding='utf-8')
-                local_file_path = os.path.join(understat_local_dir, name)
-                save_df_to_local(df, local_file_path)
-            except Exception as e:
-                safe_name = name.encode('utf-8', 'replace').decode('utf-8')
-                print("Error saving Understat file '{}': {}".format(safe_name, e))
+            if file.get('sha') and blob_shas is not None:
+                blob_shas.setdefault("understat/" + name, file.get('sha'))
+            targets.append(("understat/" + name,
+                            compressed_path(os.path.join(understat_local_dir, name), compression),
+                            file.get('url')))
+    return targets
+
+def download_merged_gw(base_local_dir, source=None, manifest=None, metrics=None, compression=None,
+                       blob_shas=None):
+    """
+    Download all players' gameweek rows in bulk to <base_local_dir>/gws/merged_gw.csv.
+    Uses the upstream gws/merged_gw.csv, falling back to concatenating the
+    per-gameweek gws/gw<N>.csv files when the merged file is unavailable.
+    Returns the local path, NOT_MODIFIED, or None if nothing could be fetched.
+    """
+    local_path = compressed_path(os.path.join(base_local_dir, "gws", "merged_gw.csv"), compression)
+    result = fetch_file("gws/merged_gw.csv", local_path, source, manifest, raw=True, metrics=metrics,
+                        blob_shas=blob_shas)
+    if result == "saved":
+        return local_path
+    if result == "unchanged":
+        return NOT_MODIFIED
+    print("Falling back to per-gameweek files.")
+    gw_dfs = []
+    gameweek = 1
+    while True:
+        df = load_csv_from_url(f"gws/gw{gameweek}.csv", source)
+        if df is None:
+            break
+        gw_dfs.append(df)
+        gameweek += 1
+    if not gw_dfs:
+        return None
+    print("Found {} gameweek files.".format(len(gw_dfs)))
+    save_df_to_local(pd.concat(gw_dfs, ignore_index=True), local_path)
+    return local_path
+
+def player_gw_columns(players_local_dir, player_idlist_df, source=None):
+    """
+    Columns of the upstream per-player gw.csv files of this season, in
+    upstream order: taken from the header of a player file already saved
+    locally, or else of one player's file fetched from the source. None if
+    neither is available.
+    """
+    for folder in (os.listdir(players_local_dir) if os.path.isdir(players_local_dir) else []):
+        gw_path = resolve_csv_path(os.path.join(players_local_dir, folder, "gw.csv"))
+        if gw_path is not None:
+            columns = read_local_csv(gw_path).columns
+            break
+    else:
+        if player_idlist_df.empty:
+            return None
+        df = load_csv_from_url(f"players/{player_folder_name(player_idlist_df.iloc[0])}/gw.csv",
+                               source)
+        if df is None:
+            return None
+        columns = df.columns
+    return [c for c in columns if c not in ('gameweek', 'player_id') + tuple(MERGED_GW_ONLY_COLUMNS)]
+
+def split_merged_gw(merged_path, player_idlist_df, players_local_dir, compression=None,
+                    columns=None):
+    """
+    Split the merged gameweek file into the per-player gw.csv files the
+    per-player download writes, reindexed to `columns` (see
+    player_gw_columns) if given. Returns "saved" or None (no rows) per player.
+    """
+    merged_df = pd.read_csv(merged_path, encoding='utf-8')
+    merged_df = merged_df.drop(columns=[c for c in MERGED_GW_ONLY_COLUMNS if c in merged_df.columns])
+    # Upstream player files are in fixture order
+    sort_cols = [c for c in ['round', 'kickoff_time'] if c in merged_df.columns]
+    if sort_cols:
+        merged_df = merged_df.sort_values(sort_cols, kind='stable')
+    groups = {element: df for element, df in merged_df.groupby('element', sort=False)}
+    results = []
+    for _, row in player_idlist_df.iterrows():
+        df = groups.get(int(row['id']))
+        if df is None:
+            results.append(None)
+            continue
+        folder_name = player_folder_name(row)
+        df = df.reset_index(drop=True)
+        if columns is not None:
+            df = df.reindex(columns=columns)
+        df = add_player_columns(df, row['id'])
+        save_df_to_local(df, compressed_path(os.path.join(players_local_dir, folder_name, "gw.csv"),
+                                             compression))
+        results.append("saved")
+    return results
+
+def split_merged_download(merged_path, base_local_dir, player_idlist_df, journal, compression=None,
+                          source=None):
+    """
+    Per-player results of a bulk run, given what download_merged_gw
+    returned: a saved merged file is split into the player files (with the
+    columns of player_gw_columns, which may fetch one player's file from
+    `source`) and journaled. None or NOT_MODIFIED give a result per player.
+    """
+    # A resumed run may have downloaded the merged file but not finished splitting it
+    if merged_path is NOT_MODIFIED and journal.resumed:
+        merged_path = compressed_path(os.path.join(base_local_dir, "gws", "merged_gw.csv"),
+                                      compression)
+    if merged_path is None:
+        return [None] * len(player_idlist_df)
+    if merged_path is NOT_MODIFIED:
+        return ["unchanged"] * len(player_idlist_df)
+    players_local_dir = os.path.join(base_local_dir, "players")
+    results = split_merged_gw(merged_path, player_idlist_df, players_local_dir, compression,
+                              player_gw_columns(players_local_dir, player_idlist_df, source))
+    journal.mark("gws/merged_gw.csv")
+    return results
+
+def local_gameweek_state(gw_path):
+    """
+    What a player's local gw.csv already holds: its last gameweek number,
+    the latest round and the fixtures of that round. None if the file has
+    no round column to compare with upstream.
+    """
+    df = pd.read_csv(gw_path, usecols=lambda c: c in ('round', 'fixture', 'gameweek'),
+                     encoding='utf-8')
+    if 'round' not in df.columns:
+        return None
+    latest_round = int(df['round'].max()) if len(df) else 0
+    return {
+        "path": gw_path,
+        "last_gameweek": int(df['gameweek'].max()) if 'gameweek' in df.columns and len(df) else len(df),
+        "latest_round": latest_round,
+        "latest_fixtures": set(df.loc[df['round'] == latest_round, 'fixture'])
+        if 'fixture' in df.columns else None,
+    }
+
+def new_gameweek_rows(gw_df, state):
+    """
+    Rows of the upstream per-gameweek rows `gw_df` (one player's, in
+    fixture order) that the player's local file described by `state` lacks:
+    later rounds, plus fixtures of its latest round played since it was
+    saved (double gameweeks, partial refreshes).
+    """
+    new = gw_df['round'] > state["latest_round"]
+    if state["latest_fixtures"] is not None and 'fixture' in gw_df.columns:
+        new |= (gw_df['round'] == state["latest_round"]) & \
+            ~gw_df['fixture'].isin(state["latest_fixtures"])
+    return gw_df[new]
+
+def append_new_gameweeks(base_local_dir, source, manifest, player_idlist_df, players_local_dir,
+                         max_workers=1, raw=False, journal=None, metrics=None, compression=None,
+                         blob_shas=None):
+    """
+    Append the rows existing player gw.csv files lack, taken from the
+    gws/gw<N>.csv files from the oldest latest round stored locally onward;
+    players without a local file are fetched in full. Returns a result per
+    player_idlist row and a DataFrame of the appended rows (or None).
+    """
+    states = local_gameweek_states(player_idlist_df, players_local_dir)
+    gw_dfs = []
+    if states:
+        first_round, rounds, listed = incremental_rounds(states, blob_shas)
+        for gameweek in rounds:
+            relative_path, local_path = gameweek_target(base_local_dir, gameweek, compression)
+            if fetch_file(relative_path, local_path, source, manifest, raw=True, journal=journal,
+                          metrics=metrics, blob_shas=blob_shas) is None:
+                report_missing_gameweek(relative_path, listed)
+                break
+            gw_dfs.append(read_local_csv(local_path))
+        print("Checked {} gameweek files from round {}.".format(len(gw_dfs), first_round))
+    results, new_rows = apply_new_gameweeks(gw_dfs, states, player_idlist_df)
+
+    missing = players_to_fetch(player_idlist_df, states)
+    if missing:
+        def fetch(row):
+            return ingest_player_gw(row, players_local_dir, source, manifest, raw, journal, metrics,
+                                    compression, blob_shas)
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                fetched = list(executor.map(fetch, missing))
+        else:
+            fetched = [fetch(row) for row in missing]
+        results.update(zip((row.name for row in missing), fetched))
+    return [results[index] for index in player_idlist_df.index], new_rows
+
+def local_gameweek_states(player_idlist_df, players_local_dir):
+    """local_gameweek_state of every player_idlist row with a usable local gw.csv, by row index."""
+    states = {}
+    for index, row in player_idlist_df.iterrows():
+        gw_path = resolve_csv_path(os.path.join(players_local_dir, player_folder_name(row), "gw.csv"))
+        state = local_gameweek_state(gw_path) if gw_path is not None else None
+        if state is not None:
+            states[index] = state
+    return states
+
+def incremental_rounds(states, blob_shas=None):
+    """
+    The first round an incremental run fetches (the oldest latest round in
+    `states`), the gameweek numbers to fetch from it on, and whether those
+    come from the listed gws/gw<N>.csv files. Without a listing every
+    number is tried until a file is missing.
+    """
+    first_round = max(1, min(state["latest_round"] for state in states.values()))
+    listed = sorted(int(match.group(1)) for match in
+                    (re.fullmatch(r"gws/gw(\d+)\.csv", path) for path in (blob_shas or {}))
+                    if match)
+    rounds = [n for n in listed if n >= first_round] if listed else itertools.count(first_round)
+    return first_round, rounds, bool(listed)
+
+def gameweek_target(base_local_dir, gameweek, compression=None):
+    """Relative and local path of the per-gameweek file gws/gw<gameweek>.csv."""
+    return (f"gws/gw{gameweek}.csv",
+            compressed_path(os.path.join(base_local_dir, "gws", f"gw{gameweek}.csv"), compression))
+
+def report_missing_gameweek(relative_path, listed):
+    """Report a gameweek file an incremental run could not fetch; expected when probing unlisted files."""
+    # Probing without a listing stops at the first gameweek not published yet
+    if listed:
+        print("Missing gameweek file '{}'; later rows may be incomplete.".format(relative_path))
+
+def apply_new_gameweeks(gw_dfs, states, player_idlist_df):
+    """
+    Append the rows of the fetched per-gameweek DataFrames `gw_dfs` that
+    each player with a local file (`states`) lacks. Returns a dict of
+    "appended", "unchanged" or None by player_idlist row index, and a
+    DataFrame of the appended rows (None if nothing was appended).
+    """
+    groups = {}
+    if gw_dfs:
+        gws_df = pd.concat(gw_dfs, ignore_index=True)
+        gws_df = gws_df.drop(columns=[c for c in MERGED_GW_ONLY_COLUMNS if c in gws_df.columns])
+        sort_cols = [c for c in ['round', 'kickoff_time'] if c in gws_df.columns]
+        if sort_cols:
+            gws_df = gws_df.sort_values(sort_cols, kind='stable')
+        groups = {element: df for element, df in gws_df.groupby('element', sort=False)}
+
+    results = {}
+    appended = []
+    for index, state in states.items():
+        player_id = int(player_idlist_df.at[index, 'id'])
+        rows = new_gameweek_rows(groups[player_id], state) if player_id in groups else None
+        if rows is None or rows.empty:
+            results[index] = "unchanged"
+            continue
+        rows = rows.reset_index(drop=True)
+        rows.insert(0, 'gameweek', np.arange(state["last_gameweek"] + 1,
+                                             state["last_gameweek"] + 1 + len(rows)))
+        rows['player_id'] = player_id
+        try:
+            append_df_to_local(rows, state["path"])
+        except Exception as e:
+            print("Error appending to '{}': {}".format(state["path"], e))
+            results[index] = None
+            continue
+        results[index] = "appended"
+        appended.append(rows)
+    if appended:
+        print("Appended {} new gameweek rows to {} player files.".format(
+            sum(len(rows) for rows in appended), len(appended)))
+    return results, pd.concat(appended, ignore_index=True) if appended else None
+
+def players_to_fetch(player_idlist_df, states):
+    """player_idlist rows without local gameweek data, which an incremental run fetches in full."""
+    missing = [row for index, row in player_idlist_df.iterrows() if index not in states]
+    if missing:
+        print("Fetching {} players without local gameweek data in full.".format(len(missing)))
+    return missing
+
+def ingest_season(base_local_dir, source, manifest=None, max_workers=1, raw=False,
+                  bulk=False, store=None, season_name=None, store_path=None, resume=True,
+                  metrics=None, compression=None, incremental=False):
+    """
+    Ingest one season's key files, Understat data and player gameweek data
+    from `source` into `base_local_dir`. See ingest_data for the options.
+    """
+    journal, metrics = begin_season(base_local_dir, resume, metrics, season_name)
+    try:
+        ingest_season_files(base_local_dir, source, manifest, max_workers, raw, bulk, store,
+                            season_name, store_path, journal, metrics, compression, incremental)
+    finally:
+        journal.close()
+    # Only reached when the run was not interrupted
+    journal.clear()
+
+def begin_season(base_local_dir, resume=True, metrics=None, season_name=None):
+    """
+    Prepare `base_local_dir` for a season's ingestion: write its schema.json
+    and open its journal (discarding one left by an interrupted run unless
+    `resume`). Returns the journal and `metrics` tagged with the season.
+    """
+    os.makedirs(base_local_dir, exist_ok=True)
+    journal_path = os.path.join(base_local_dir, JOURNAL_FILE)
+    if not resume and os.path.exists(journal_path):
+        os.remove(journal_path)
+    journal = IngestJournal(journal_path)
+    if journal.resumed:
+        print("Resuming interrupted ingestion: {} files already done.".format(len(journal.done)))
+    if metrics is not None and season_name:
+        metrics = metrics.tagged(season=season_name)
+    write_schema(base_local_dir)
+    return journal, metrics
+
+def ingest_season_files(base_local_dir, source, manifest, max_workers, raw, bulk, store,
+                        season_name, store_path, journal, metrics, compression=None,
+                        incremental=False):
+    """Body of ingest_season; fetches every file not already recorded in `journal`."""
+    # --- List the blob SHA of every upstream file in one call (git trees API over HTTP) ---
+    blob_shas = {}
+    if manifest is not None:
+        try:
+            blob_shas = source.list_tree() or {}
+        except Exception as e:
+            # Without SHAs every file is still checked with a conditional request
+            print("Error listing upstream blob SHAs:", e)
+        if blob_shas:
+            print("Listed {} upstream files.".format(len(blob_shas)))
+
+    # --- Download key files from the root of the data directory ---
+    for file_name in KEY_FILES:
+        local_path = compressed_path(os.path.join(base_local_dir, file_name), compression)
+        fetch_file(file_name, local_path, source, manifest, raw, journal=journal, metrics=metrics,
+                   blob_shas=blob_shas)
+
+    # --- Ingest Understat files using the source's directory listing (the GitHub API over HTTP) ---
+    try:
+        files = source.list_dir("understat")
+    except Exception as e:
+        # Player data does not depend on Understat, so carry on without it
+        print("Error listing Understat files:", e)
+        files = []
+    for relative_path, local_path, url in understat_targets(files, base_local_dir, compression,
+                                                            blob_shas):
+        try:
+            fetch_file(relative_path, local_path, source, manifest, raw, url=url, journal=journal,
+                       metrics=metrics, blob_shas=blob_shas)
+        except Exception as e:
+            print_understat_error(relative_path, e)
 
     # --- Ingest all players' gameweek data ---
+    player_idlist_df = season_player_idlist(base_local_dir)
+    if player_idlist_df is None:
+        return
     players_local_dir = os.path.join(base_local_dir, "players")
-    os.makedirs(players_local_dir, exist_ok=True)
-    # Load the local player_idlist file
-    player_idlist_path = os.path.join(base_local_dir, "player_idlist.csv")
-    if os.path.exists(player_idlist_path):
-        player_idlist_df = pd.read_csv(player_idlist_path)
+
+    rows = [row for _, row in player_idlist_df.iterrows()]
+    new_rows = None
+    if incremental:
+        results, new_rows = append_new_gameweeks(base_local_dir, source, manifest, player_idlist_df,
+                                                 players_local_dir, max_workers, raw, journal,
+                                                 metrics, compression, blob_shas)
+    elif bulk:
+        if "gws/merged_gw.csv" in journal:
+            results = ["skipped"] * len(rows)
+        else:
+            merged_path = download_merged_gw(base_local_dir, source, manifest, metrics, compression,
+                                             blob_shas)
+            results = split_merged_download(merged_path, base_local_dir, player_idlist_df, journal,
+                                            compression, source)
+    elif max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(
+                lambda row: ingest_player_gw(row, players_local_dir, source, manifest, raw, journal,
+                                             metrics, compression, blob_shas),
+                rows))
     else:
+        results = [ingest_player_gw(row, players_local_dir, source, manifest, raw, journal, metrics,
+                                    compression, blob_shas)
+                   for row in rows]
+    finish_season(base_local_dir, results, new_rows, store, store_path, season_name)
+
+def print_understat_error(relative_path, error):
+    """Report an Understat file that could not be saved; its name may not be valid UTF-8."""
+    safe_name = relative_path.split("/", 1)[1].encode('utf-8', 'replace').decode('utf-8')
+    print("Error saving Understat file '{}': {}".format(safe_name, error))
+
+def season_player_idlist(base_local_dir):
+    """The season's local player_idlist.csv (None, reported, if missing); creates players/."""
+    os.makedirs(os.path.join(base_local_dir, "players"), exist_ok=True)
+    player_idlist_df = read_local_csv(os.path.join(base_local_dir, "player_idlist.csv"))
+    if player_idlist_df is None:
         print("Local player_idlist.csv not found.")
+    return player_idlist_df
+
+def finish_season(base_local_dir, results, new_rows=None, store=None, store_path=None,
+                  season_name=None):
+    """
+    Report the per-player `results` of a season's ingestion and bring its
+    `store` up to date: rows appended by an incremental run (`new_rows`) are
+    added to an existing store, anything else rebuilds it.
+    """
+    print("Player gameweek files: {} saved, {} unchanged, {} skipped, {} failed.".format(
+        results.count("saved"), results.count("unchanged"), results.count("skipped"),
+        results.count(None)))
+    if store is None:
+        return
+    players_local_dir = os.path.join(base_local_dir, "players")
+    store_path = store_path or default_store_path(base_local_dir, store)
+    season_label = season_name or season
+    appendable = new_rows is not None and "saved" not in results and "skipped" not in results
+    if store == "sqlite" and appendable and season_label in sqlite_store_seasons(store_path):
+        write_sqlite_store(base_local_dir, season_label, store_path, include_player_gw=False)
+        append_sqlite_player_gw(new_rows, season_label, store_path)
+    elif store != "sqlite" and appendable and \
+            os.path.exists(os.path.join(store_path, "season={}".format(season_label))):
+        append_player_gw_store(new_rows, season_label, store_path, format=store)
+    else:
+        update_player_gw_store(results, players_local_dir, store, store_path, season_name)
+
+def default_store_path(base_local_dir, store):
+    """Where ingestion keeps a `store` ("parquet", "arrow" or "sqlite") under the data directory."""
+    return os.path.join(base_local_dir, "fpl.sqlite" if store == "sqlite" else "player_gw_store")
+
+def update_player_gw_store(results, players_local_dir, store, store_path, season_name=None):
+    """
+    Rebuild the season's partition of the columnar store from the per-player
+    files when any were saved or appended to (or skipped by a resumed run,
+    which may have saved them earlier), or when the store does not exist yet.
+    A "sqlite" store is always reloaded, as its key and Understat tables may
+    have changed even when no player file did.
+    """
+    if store == "sqlite":
+        write_sqlite_store(os.path.dirname(players_local_dir), season_name or season, store_path)
         return
+    if "saved" in results or "appended" in results or "skipped" in results or \
+            not os.path.exists(store_path):
+        schemas = load_schema(os.path.dirname(players_local_dir))
+        player_gw_df = load_player_gw_dir(players_local_dir, schemas.get("players/*/gw.csv"))
+        if player_gw_df is not None:
+            write_player_gw_store(player_gw_df, season_name or season, store_path, format=store)
+
+class LazyPlayerLoader:
+    """
+    On-demand access to individual players' gameweek data. A player's gw.csv
+    is downloaded the first time it is asked for (files already ingested are
+    used as they are), prefetch() starts downloads in the background, and
+    get()/load() return the rows. Close it to save the manifest.
+    """
+    def __init__(self, base_local_dir="data", source=None, max_workers=8, use_cache=True,
+                 raw=False, compression=None, season_name=None, api_url=None):
+        self.base_local_dir = base_local_dir
+        self.players_local_dir = os.path.join(base_local_dir, "players")
+        self.raw = raw
+        self.compression = compression
+        self._client = None
+        if not isinstance(source, DataSource):
+            self._client = HttpClient(pool_size=max(max_workers, 10))
+        self.source = make_source(source, self._client, season=season_name, api_url=api_url)
+        os.makedirs(base_local_dir, exist_ok=True)
+        self.manifest = IngestManifest(os.path.join(base_local_dir, MANIFEST_FILE)) if use_cache else None
+        self.schema = load_schema(base_local_dir).get("players/*/gw.csv")
+        self.fetched = 0
+        self._rows = None
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def player_rows(self):
+        """
+        player_idlist.csv rows keyed by player id, fetching the file if
+        needed. None if it is unavailable; the next call tries again.
+        """
+        with self._lock:
+            if self._rows is None:
+                idlist_path = compressed_path(os.path.join(self.base_local_dir, "player_idlist.csv"),
+                                              self.compression)
+                if resolve_csv_path(os.path.join(self.base_local_dir, "player_idlist.csv")) is None:
+                    fetch_file("player_idlist.csv", idlist_path, self.source, self.manifest)
+                player_idlist_df = read_local_csv(os.path.join(self.base_local_dir,
+                                                               "player_idlist.csv"))
+                if player_idlist_df is not None:
+                    self._rows = {int(row['id']): row for _, row in player_idlist_df.iterrows()}
+            return self._rows
+
+    def _ensure_local(self, player_id):
+        """Local path of the player's gw.csv, downloading it if missing; None if unavailable."""
+        rows = self.player_rows()
+        if rows is None:
+            print("No player_idlist.csv to look up player {}.".format(player_id))
+            return None
+        row = rows.get(int(player_id))
+        if row is None:
+            print("Player {} is not in player_idlist.csv.".format(player_id))
+            return None
+        local_path = os.path.join(self.players_local_dir, player_folder_name(row), "gw.csv")
+        if resolve_csv_path(local_path) is None:
+            if ingest_player_gw(row, self.players_local_dir, self.source, self.manifest, self.raw,
+                                compression=self.compression) is None:
+                return None
+            with self._lock:
+                self.fetched += 1
+        return resolve_csv_path(local_path)
+
+    def _submit(self, player_id):
+        with self._lock:
+            future = self._futures.get(int(player_id))
+            if future is None or (future.done() and (future.exception() is not None or
+                                                     future.result() is None)):
+                # Failed or raising downloads are retried on the next access
+                future = self._executor.submit(self._ensure_local, player_id)
+                self._futures[int(player_id)] = future
+            return future
+
+    def prefetch(self, player_ids):
+        """
+        Start downloading the gameweek files of `player_ids` not saved
+        locally yet. Returns the future of each player's local path.
+        """
+        return {int(player_id): self._submit(player_id) for player_id in player_ids}
+
+    def get(self, player_id):
+        """The player's gameweek rows (with player_id and gameweek columns), or None."""
+        return self.load([player_id])
+
+    def load(self, player_ids):
+        """
+        Gameweek rows of all `player_ids`, concatenated and cast to the
+        season's schema dtypes as load_player_gw_dir does, or None if none
+        are available. A player whose download fails is tried once per call.
+        """
+        futures = self.prefetch(player_ids)
+        player_gw_dfs = []
+        for player_id in player_ids:
+            gw_file = futures[int(player_id)].result()
+            if gw_file is not None:
+                folder_name = os.path.basename(os.path.dirname(gw_file))
+                player_gw_dfs.append(load_player_gw_file(gw_file, folder_name, self.schema,
+                                                         cast=False))
+        if not player_gw_dfs:
+            return None
+        player_gw_df = pd.concat(player_gw_dfs, ignore_index=True)
+        return apply_schema(player_gw_df, self.schema) if self.schema else player_gw_df
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self.manifest is not None:
+            self.manifest.save()
+        if self._client is not None:
+            self.source.close()
+            self._client.close()
+
+def plan_season(base_local_dir, source, manifest=None, compression=None, incremental=False):
+    """
+    Work out what ingest_season would fetch from `source` using only the
+    listings. Every remote path gets an action ("skipped", "unchanged",
+    "check" or "fetch", as fetch_file would decide) and its listed size.
+    Returns {"files", "players", "merged"}, plus "gameweeks" and
+    "new_players" with `incremental`.
+    """
+    journal_path = os.path.join(base_local_dir, JOURNAL_FILE)
+    journaled = IngestJournal(journal_path).done if os.path.exists(journal_path) else set()
+    try:
+        tree = source.list_tree_entries() or {}
+    except Exception as e:
+        print("Error listing upstream files:", e)
+        tree = {}
+
+    def plan_file(relative_path, local_path, sha=None, size=None):
+        listed = tree.get(relative_path, {})
+        sha = listed.get("sha") or sha
+        size = listed.get("size") if listed.get("size") is not None else size
+        entry = manifest.get(relative_path) if manifest is not None else None
+        if relative_path in journaled:
+            action = "skipped"
+        elif entry is None or not os.path.exists(local_path):
+            action = "fetch"
+        elif sha and entry.get("blob_sha") == sha:
+            action = "unchanged"
+        elif sha and entry.get("blob_sha"):
+            action = "fetch"
+        else:
+            action = "check"
+        return {"path": relative_path, "action": action, "size": size}
+
+    files = []
+    for file_name in KEY_FILES:
+        files.append(plan_file(file_name, compressed_path(os.path.join(base_local_dir, file_name),
+                                                          compression)))
+    try:
+        listing = [(file.get('name'), file.get('sha'), file.get('size'))
+                   for file in source.list_dir("understat") if file.get('type') == 'file']
+    except Exception as e:
+        print("Error listing Understat files:", e)
+        listing = [(path.split("/", 1)[1], None, None) for path in tree
+                   if path.startswith("understat/") and path.count("/") == 1]
+    for name, sha, size in listing:
+        if name and name.endswith('.csv'):
+            local_path = compressed_path(os.path.join(base_local_dir, "understat", name), compression)
+            files.append(plan_file("understat/" + name, local_path, sha, size))
+
+    player_idlist_df = read_local_csv(os.path.join(base_local_dir, "player_idlist.csv"))
+    if player_idlist_df is not None:
+        folders = [player_folder_name(row) for _, row in player_idlist_df.iterrows()]
+    else:
+        folders = sorted(path.split("/")[1] for path in tree
+                         if fnmatch.fnmatch(path, "players/*/gw.csv"))
+    players = [plan_file(f"players/{folder}/gw.csv",
+                         compressed_path(os.path.join(base_local_dir, "players", folder, "gw.csv"),
+                                         compression))
+               for folder in folders]
+    merged = plan_file("gws/merged_gw.csv",
+                       compressed_path(os.path.join(base_local_dir, "gws", "merged_gw.csv"),
+                                       compression))
+    plan = {"files": files, "players": players, "merged": merged}
+    if incremental:
+        latest_rounds, new_players = [], []
+        for folder, player in zip(folders, players):
+            gw_path = resolve_csv_path(os.path.join(base_local_dir, "players", folder, "gw.csv"))
+            state = local_gameweek_state(gw_path) if gw_path is not None else None
+            if state is None:
+                new_players.append(dict(player, action="skipped" if player["action"] == "skipped"
+                                        else "fetch"))
+            else:
+                latest_rounds.append(state["latest_round"])
+        gameweeks = []
+        if latest_rounds:
+            first_round = max(1, min(latest_rounds))
+            listed = sorted(int(match.group(1)) for match in
+                            (re.fullmatch(r"gws/gw(\d+)\.csv", path) for path in tree) if match)
+            if not listed:
+                print("No gameweek file listing; the incremental plan omits the gws/gw<N>.csv "
+                      "files from round {} onward.".format(first_round))
+            gameweeks = [plan_file(f"gws/gw{n}.csv",
+                                   compressed_path(os.path.join(base_local_dir, "gws", f"gw{n}.csv"),
+                                                   compression))
+                         for n in listed if n >= first_round]
+        plan.update(gameweeks=gameweeks, new_players=new_players)
+    return plan
+
+def summarize_plan(planned, history, max_workers):
+    """
+    Totals for a list of planned files: a count per action, the requests
+    and bytes to fetch ("check" requests usually transfer nothing, so their
+    bytes are not counted) and the estimated duration from `history`.
+    """
+    summary = {action: 0 for action in ["fetch", "check", "unchanged", "skipped"]}
+    for file in planned:
+        summary[file["action"]] += 1
+    to_fetch = [file for file in planned if file["action"] == "fetch"]
+    summary["requests"] = summary["fetch"] + summary["check"]
+    summary["bytes"] = sum(file["size"] or 0 for file in to_fetch)
+    summary["unknown_size"] = sum(file["size"] is None for file in to_fetch)
+    summary["estimated_s"] = estimate_duration(summary["requests"], summary["bytes"], history,
+                                               max_workers)
+    return summary
+
+def plan_ingestion(base_local_dir, seasons, max_workers, compression=None, incremental=False):
+    """
+    Plan a refresh of every season in `seasons` ({name: (season dir,
+    DataSource, manifest)}) with plan_season, and compare per-player, bulk
+    and, with `incremental`, incremental runs. Prints a report and returns
+    the per-season and total summaries and the "recommended" mode.
+    """
+    history = load_ingest_history(os.path.join(base_local_dir, HISTORY_FILE))
+    modes = ["per_player", "bulk"] + (["incremental"] if incremental else [])
+    report = {"seasons": {}}
+    planned = {mode: [] for mode in modes}
+    for season_name, (season_dir, source, manifest) in seasons.items():
+        plan = plan_season(season_dir, source, manifest, compression, incremental)
+        season_planned = {
+            "per_player": plan["files"] + plan["players"],
+            # A bulk run rewrites every player file from the merged one whenever it changes
+            "bulk": plan["files"] + [plan["merged"]],
+        }
+        if incremental:
+            season_planned["incremental"] = plan["files"] + plan["gameweeks"] + plan["new_players"]
+        report["seasons"][season_name] = {mode: summarize_plan(season_planned[mode], history,
+                                                               max_workers)
+                                          for mode in modes}
+        report["seasons"][season_name]["plan"] = plan
+        for mode in modes:
+            planned[mode] += season_planned[mode]
+    for mode in modes:
+        report[mode] = summarize_plan(planned[mode], history, max_workers)
+    # Compare on requests when there is no history to turn them into seconds
+    cost = "estimated_s" if report["bulk"]["estimated_s"] is not None else "requests"
+    report["recommended"] = min(modes, key=lambda mode: report[mode][cost])
+
+    print("\nIngestion plan ({} season{}, nothing downloaded):".format(
+        len(seasons), "" if len(seasons) == 1 else "s"))
+    for mode in modes:
+        summary = report[mode]
+        estimate = ("~{:.1f}s".format(summary["estimated_s"]) if summary["estimated_s"] is not None
+                    else "no throughput history yet")
+        print("  {:<12} {} to fetch ({:.2f} MB{}), {} to check, {} unchanged, {} skipped; {}".format(
+            mode + ":", summary["fetch"], summary["bytes"] / 1e6,
+            " + {} of unknown size".format(summary["unknown_size"]) if summary["unknown_size"] else "",
+            summary["check"], summary["unchanged"], summary["skipped"], estimate))
+    print("  recommended: {}".format(report["recommended"]))
+    return report
+
+def ingest_data(max_workers=1, max_retries=3, backoff_factor=0.5, use_cache=True, raw=False,
+                bulk=False, source=None, store=None, seasons=None, resume=True,
+                adaptive=True, scheduler=None, metrics_path=None, api_url=None, compression=None,
+                plan=False, incremental=False):
+    """
+    Downloads required data files from GitHub (or another data source) and
+    saves them locally. This includes key files, Understat data, and all
+    players' gameweek data. Returns the request counters, the "scheduler"
+    status and the "metrics" summary. See README.md for usage.
+
+    max_workers: concurrent downloads, shared by all seasons (1 is sequential).
+    max_retries, backoff_factor: retries of transient HTTP failures and the first backoff (s).
+    use_cache: keep data/manifest.json and skip files unchanged upstream.
+    raw: save upstream files byte-for-byte instead of parsing and re-writing them.
+    bulk: split player data from the merged gameweek file instead of one request per player.
+    source: HTTP base URL, local mirror, archive or DataSource (see make_source).
+    store: also write a "parquet"/"arrow" player gameweek dataset or a "sqlite" database.
+    seasons: ingest these seasons concurrently into data/<season>/.
+    resume: skip the files an interrupted run journaled.
+    adaptive: back off when the server throttles, then ramp back up.
+    scheduler: DownloadScheduler to use instead of a new one.
+    metrics_path: write the per-file fetch metrics to this JSON file.
+    api_url: listing API URL for an HTTP source not on GitHub.
+    compression: save files "gzip" or "zstd" compressed.
+    plan: only report what a run would fetch (see plan_ingestion).
+    incremental: append new gameweek rows to existing player files.
+    """
+    base_local_dir = "data"
+    os.makedirs(base_local_dir, exist_ok=True)
+    scheduler = scheduler or DownloadScheduler(max_workers, adaptive=adaptive)
+    metrics = IngestMetrics()
+    client = HttpClient(max_retries=max_retries, backoff_factor=backoff_factor,
+                        pool_size=max(max_workers, 10), scheduler=scheduler)
+
+    if plan:
+        targets = {}
+        for season_name in seasons or [season]:
+            season_dir = os.path.join(base_local_dir, season_name) if seasons else base_local_dir
+            data_source = make_source(source, client, season=season_name if seasons else None,
+                                      api_url=api_url)
+            manifest = IngestManifest(os.path.join(season_dir, MANIFEST_FILE)) if use_cache else None
+            targets[season_name] = (season_dir, data_source, manifest)
+        try:
+            return plan_ingestion(base_local_dir, targets, max_workers, compression, incremental)
+        finally:
+            for _, data_source, _ in targets.values():
+                if data_source is not source:
+                    data_source.close()
+            client.close()
 
-    for idx, row in player_idlist_df.iterrows():
-        # Construct folder name in the format "FirstName_SecondName_ID"
-        folder_name = f"{row['first_name']}_{row['second_name']}_{int(row['id'])}"
-        relative_path = f"players/{folder_name}/gw.csv"
-        df = load_csv_from_url(relative_path)
-        if df is not None:
-            # Save the file preserving folder structure: data/players/<folder_name>/gw.csv
-            folder_path = os.path.join(players_local_dir, folder_name)
-            os.makedirs(folder_path, exist_ok=True)
-            local_file_path = os.path.join(folder_path, "gw.csv")
-            df['player_id'] = row['id']
-            # If a gameweek column is missing, add one (assumes row order reflects gameweeks)
-            if 'gameweek' not in df.columns:
-                df = df.reset_index().rename(columns={'index': 'gameweek'})
-                df['gameweek'] = df['gameweek'] + 1
-            save_df_to_local(df, local_file_path)
+    if not seasons:
+        owns_source = not isinstance(source, DataSource)
+        data_source = make_source(source, client, api_url=api_url)
+        manifest = IngestManifest(os.path.join(base_local_dir, MANIFEST_FILE)) if use_cache else None
+        try:
+            ingest_season(base_local_dir, data_source, manifest, max_workers, raw, bulk, store,
+                          resume=resume, metrics=metrics, compression=compression,
+                          incremental=incremental)
+        finally:
+            if owns_source:
+                data_source.close()
+            if manifest is not None:
+                manifest.save()
+        stats = data_source.stats
+    else:
+        def run_season(season_name):
+            season_dir = os.path.join(base_local_dir, season_name)
+            os.makedirs(season_dir, exist_ok=True)
+            data_source = make_source(source, client, season=season_name, api_url=api_url)
+            manifest = IngestManifest(os.path.join(season_dir, MANIFEST_FILE)) if use_cache else None
+            try:
+                ingest_season(season_dir, data_source, manifest, max_workers, raw, bulk, store,
+                              season_name, default_store_path(base_local_dir, store), resume,
+                              metrics, compression, incremental)
+            finally:
+                if not isinstance(data_source, HttpSource):
+                    data_source.close()
+                if manifest is not None:
+                    manifest.save()
+            return data_source.stats
+
+        with ThreadPoolExecutor(max_workers=len(seasons)) as executor:
+            season_stats = list(executor.map(run_season, seasons))
+        client.close()
+        # HTTP sources all report the shared client's counters; sum the others
+        stats = dict(client.stats)
+        for data_source_stats in season_stats:
+            if data_source_stats is not client.stats:
+                for key, value in data_source_stats.items():
+                    stats[key] += value
 
+    return finish_ingestion(base_local_dir, stats, scheduler, metrics, max_workers, metrics_path)
+
+def finish_ingestion(base_local_dir, stats, scheduler, metrics, max_workers, metrics_path=None):
+    """
+    Add the scheduler status and metrics summary to a run's request `stats`,
+    record the run in the ingestion history, write `metrics_path` if given
+    and print the run summary. Returns the completed stats.
+    """
+    stats = dict(stats, scheduler=scheduler.status(), metrics=metrics.summary())
+    record_ingest_history(os.path.join(base_local_dir, HISTORY_FILE), stats["metrics"], max_workers)
+    if metrics_path:
+        metrics.write_json(metrics_path)
     print("\nData ingestion complete. All files are saved in the 'data' directory.")
+    print("Requests: {requests}, retries: {retries}, failures: {failures}, "
+          "not modified: {not_modified}".format(**stats))
+    print("Fetched {files} files, {bytes} bytes in {elapsed:.1f}s ({mb_per_s:.2f} MB/s); "
+          "fetch latency p50 {latency_p50:.3f}s, p95 {latency_p95:.3f}s".format(**stats["metrics"]))
+    if scheduler.throttled:
+        print("Throttled {} times; final concurrency limit {}.".format(
+            scheduler.throttled, stats["scheduler"]["limit"]))
+    return stats
 
 if __name__ == "__main__":
-    ingest_data()
+    parser = argparse.ArgumentParser(description="Download FPL data files into the local data directory.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of concurrent player gameweek downloads (default: 1, sequential).")
+    parser.add_argument("--retries", type=int, default=3,
+                        help="Retries per file for transient HTTP failures (default: 3).")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignore data/manifest.json and re-download every file unconditionally.")
+    parser.add_argument("--raw", action="store_true",
+                        help="Save upstream files byte-for-byte instead of parsing and re-writing them.")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Fetch player gameweek data from the merged gameweek file instead of per player.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Append only new gameweek rows to existing player files, from the "
+                             "per-gameweek files, instead of re-downloading them.")
+    parser.add_argument("--source", default=None,
+                        help="Read from an HTTP base URL, a local mirror of the season data directory, "
+                             "or a .zip/.tar archive instead of GitHub.")
+    parser.add_argument("--compress", choices=sorted(CSV_COMPRESSION), default=None,
+                        help="Save every file compressed with gzip or zstd.")
+    parser.add_argument("--store", choices=["parquet", "arrow", "sqlite"], default=None,
+                        help="Also consolidate player gameweek data into a columnar dataset, or "
+                             "load every table into an indexed SQLite database (data/fpl.sqlite).")
+    parser.add_argument("--api-url", default=None,
+                        help="GitHub contents API URL matching an HTTP --source that is not GitHub.")
+    parser.add_argument("--seasons", nargs="+", default=None,
+                        help="Ingest several seasons (e.g. 2023-24 2024-25) into data/<season>/.")
+    parser.add_argument("--no-adaptive", action="store_true",
+                        help="Keep concurrency fixed at --workers instead of backing off when throttled.")
+    parser.add_argument("--metrics", default=None, metavar="PATH",
+                        help="Write per-file fetch metrics and their summary to PATH as JSON.")
+    parser.add_argument("--restart", action="store_true",
+                        help="Discard the journal of an interrupted run instead of resuming it.")
+    parser.add_argument("--plan", action="store_true",
+                        help="Only report how many files and bytes a run would fetch and how long "
+                             "it should take, for both per-player and --bulk ingestion.")
+    args = parser.parse_args()
+    ingest_data(max_workers=args.workers, max_retries=args.retries, use_cache=not args.no_cache,
+                raw=args.raw, bulk=args.bulk, source=args.source, api_url=args.api_url,
+                store=args.store, seasons=args.seasons, resume=not args.restart,
+                adaptive=not args.no_adaptive, metrics_path=args.metrics,
+                compression=args.compress, plan=args.plan, incremental=args.incremental)
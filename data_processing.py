@@ -1,75 +1,145 @@
 import os
-import ast
+import re
+import json
+import shutil
+import hashlib
+import inspect
+import itertools
+import joblib
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, Tuple, Optional
+from typing import Dict, Any, List, Tuple, Optional
+from numpy.lib.stride_tricks import sliding_window_view
 from sklearn.preprocessing import StandardScaler
+from data_store import (load_player_gw_dir, read_player_gw_store, read_local_csv, load_schema,
+                        schema_for, read_sqlite_table, read_player_gw_sqlite, sqlite_store_seasons,
+                        resolve_csv_path, SCHEMA_FILE)
+from data_ingestion import LazyPlayerLoader
 
-def process_data() -> Dict[str, Any]:
+# Cache of the parsed fixture stats, kept next to the season's fixtures file
+FIXTURE_STATS_CACHE = "fixture_stats.npz"
+
+# Prefix of the per-fixture stat total columns of each side
+FIXTURE_STAT_SIDES = {'h': 'home', 'a': 'away'}
+
+# Processed-feature cache of cached_process_data, and the total size its entries are evicted down to
+FEATURE_CACHE_DIR = os.path.join("data", "feature_cache")
+FEATURE_CACHE_MAX_BYTES = 1024 ** 3
+
+# Bumped whenever process_data returns something different for the same inputs, so older entries miss
+FEATURE_CACHE_VERSION = 1
+
+# One token of a fixture 'stats' string (the repr of the API's list of
+# {'identifier', 'a', 'h'} dicts): a stat identifier, the start of its away
+# or home list, or one {'value', 'element'} entry, in either key order
+FIXTURE_STATS_TOKEN = re.compile(
+    r"""['"]identifier['"]:\s*['"](?P<identifier>\w+)['"]"""
+    r"""|['"](?P<side>[ah])['"]:\s*\["""
+    r"""|['"]value['"]:\s*(?P<value>-?\d+),\s*['"]element['"]:\s*(?P<element>\d+)"""
+    r"""|['"]element['"]:\s*(?P<element2>\d+),\s*['"]value['"]:\s*(?P<value2>-?\d+)""")
+
+def process_data(player_store: Optional[str] = None,
+                 player_columns: Optional[List[str]] = None,
+                 store_format: str = "parquet",
+                 seasons: Optional[List[str]] = None,
+                 player_ids: Optional[List[int]] = None,
+                 player_source: Optional[str] = None,
+                 load_workers: int = 1,
+                 seq_length: int = 5,
+                 feature_cols: Optional[List[str]] = None,
+                 target_col: str = 'points') -> Dict[str, Any]:
     """
     Loads locally saved CSV files from the data directory,
     aggregates and processes them, normalizes feature columns,
     and creates sequences for LSTM.
-    Returns a dictionary containing key DataFrames and the LSTM input (X, y).
+    Returns a dictionary containing key DataFrames, the LSTM input (X, y) and the fitted "scaler".
+
+    player_store, store_format: read player data from an ingestion store instead of the gw.csv files.
+    player_columns: columns to read from a columnar store.
+    seasons: load every listed season, with the key files of the last one.
+    player_ids: only load these players, downloading missing ones from `player_source`.
+    load_workers: parse the gw.csv files in a pool of this many processes.
+    seq_length, feature_cols, target_col: window length, input features and predicted column.
     """
-    base_local_dir = "data"
+    base_local_dir = os.path.join("data", seasons[-1]) if seasons else "data"
     teams_path = os.path.join(base_local_dir, "teams.csv")
     fixtures_path = os.path.join(base_local_dir, "fixtures.csv")
     player_idlist_path = os.path.join(base_local_dir, "player_idlist.csv")
     playerraw_path = os.path.join(base_local_dir, "playerraw.csv")
     players_local_dir = os.path.join(base_local_dir, "players")
 
-    # Load key files
-    teams_df = pd.read_csv(teams_path) if os.path.exists(teams_path) else None
-    fixtures_df = pd.read_csv(fixtures_path) if os.path.exists(fixtures_path) else None
-    player_idlist_df = pd.read_csv(player_idlist_path) if os.path.exists(player_idlist_path) else None
-    playerraw_df = pd.read_csv(playerraw_path) if os.path.exists(playerraw_path) else None
-
-    # Aggregate player gameweek data from the players folder
-    player_gw_dfs = []
-    if os.path.exists(players_local_dir):
-        for folder in os.listdir(players_local_dir):
-            folder_path = os.path.join(players_local_dir, folder)
-            if os.path.isdir(folder_path):
-                gw_file = os.path.join(folder_path, "gw.csv")
-                if os.path.exists(gw_file):
-                    df = pd.read_csv(gw_file)
-                    player_gw_dfs.append(df)
-        if player_gw_dfs:
-            player_gw_df = pd.concat(player_gw_dfs, ignore_index=True)
-            print("Aggregated player gameweek data shape:", player_gw_df.shape)
-            # Print columns for debugging
-            print("Player GW Data columns:", player_gw_df.columns.tolist())
-        else:
-            player_gw_df = None
+    use_sqlite = store_format == "sqlite" and player_store is not None and os.path.exists(player_store)
+    schemas = load_schema(base_local_dir)
+    if use_sqlite:
+        # Query the key tables of one season from the embedded database
+        stored_seasons = sorted(sqlite_store_seasons(player_store))
+        key_seasons = [seasons[-1]] if seasons else stored_seasons[-1:]
+        teams_df = read_sqlite_table("teams", player_store, seasons=key_seasons)
+        fixtures_df = read_sqlite_table("fixtures", player_store, seasons=key_seasons)
+        player_idlist_df = read_sqlite_table("player_idlist", player_store, seasons=key_seasons)
+        playerraw_df = read_sqlite_table("players_raw", player_store, seasons=key_seasons)
     else:
-        player_gw_df = None
+        # Load key files (plain or compressed, whichever ingestion saved) with their schema dtypes
+        teams_df = read_local_csv(teams_path, schema_for("teams.csv", schemas))
+        fixtures_df = read_local_csv(fixtures_path, schema_for("fixtures.csv", schemas))
+        player_idlist_df = read_local_csv(player_idlist_path, schema_for("player_idlist.csv", schemas))
+        playerraw_df = read_local_csv(playerraw_path, schema_for("players_raw.csv", schemas))
 
-    # Parse fixture stats (convert nested 'stats' string into Python objects)
+    # Aggregate player gameweek data from the SQLite or columnar store, or the players folder
+    if use_sqlite:
+        player_gw_df = read_player_gw_sqlite(player_store, columns=player_columns, seasons=seasons,
+                                             player_ids=player_ids)
+    elif player_store is not None and os.path.exists(player_store):
+        player_gw_df = read_player_gw_store(player_store, columns=player_columns,
+                                            seasons=seasons, format=store_format,
+                                            player_ids=player_ids)
+    elif player_ids is not None:
+        # Only the shortlisted players, fetching any not ingested yet
+        season_dfs = []
+        for season in seasons or [None]:
+            season_dir = os.path.join("data", season) if season else base_local_dir
+            with LazyPlayerLoader(season_dir, player_source, season_name=season) as loader:
+                season_df = loader.load(player_ids)
+                if loader.fetched:
+                    print("Fetched {} of {} players on demand.".format(loader.fetched,
+                                                                       len(player_ids)))
+            if season_df is not None:
+                if season:
+                    season_df['season'] = season
+                season_dfs.append(season_df)
+        player_gw_df = pd.concat(season_dfs, ignore_index=True) if season_dfs else None
+    elif seasons:
+        season_dfs = []
+        for season in seasons:
+            season_dir = os.path.join("data", season)
+            season_df = load_player_gw_dir(os.path.join(season_dir, "players"),
+                                           load_schema(season_dir).get("players/*/gw.csv"),
+                                           workers=load_workers)
+            if season_df is not None:
+                season_df['season'] = season
+                season_dfs.append(season_df)
+        player_gw_df = pd.concat(season_dfs, ignore_index=True) if season_dfs else None
+    else:
+        player_gw_df = load_player_gw_dir(players_local_dir, schemas.get("players/*/gw.csv"),
+                                          workers=load_workers)
+    if player_gw_df is not None:
+        print("Aggregated player gameweek data shape:", player_gw_df.shape)
+        # Print columns for debugging
+        print("Player GW Data columns:", player_gw_df.columns.tolist())
+
+    # Parse fixture stats into a long table (cached next to the fixtures) and total them per side
+    fixture_stats_df = None
     if fixtures_df is not None and 'stats' in fixtures_df.columns:
-        def parse_stats(stats_str: str) -> list:
-            if pd.isna(stats_str) or stats_str.strip() == "":
-                return []
-            try:
-                return ast.literal_eval(stats_str)
-            except Exception as e:
-                print("Error parsing stats:", e)
-                return []
-        fixtures_df['parsed_stats'] = fixtures_df['stats'].apply(parse_stats)
-
-        def extract_home_goals(parsed_stats: list) -> int:
-            for stat in parsed_stats:
-                if stat.get('identifier') == 'goals_scored':
-                    home_stats = stat.get('h', [])
-                    return sum(item.get('value', 0) for item in home_stats)
-            return 0
-
-        fixtures_df['home_goals_scored'] = fixtures_df['parsed_stats'].apply(extract_home_goals)
+        fixture_stats_df = load_fixture_stats(fixtures_df, os.path.join(base_local_dir,
+                                                                        FIXTURE_STATS_CACHE))
+        fixtures_df = add_fixture_stat_totals(fixtures_df, fixture_stats_df)
         print("\n--- Fixtures with Home Goals Scored ---")
         print(fixtures_df[['id', 'home_goals_scored']].head())
 
     # Define the required columns for sequence creation
-    required_cols = ['player_id', 'gameweek', 'minutes', 'goals', 'assists', 'points']
+    if feature_cols is None:
+        feature_cols = ['minutes', 'goals', 'assists']
+    required_cols = list(dict.fromkeys(['player_id', 'gameweek'] + feature_cols + [target_col]))
     
     # Check and rename columns if necessary in player_gw_df
     if player_gw_df is not None:
@@ -77,15 +147,7 @@ def process_data() -> Dict[str, Any]:
         print("Initial columns in player_gw_df:", player_gw_df.columns.tolist())
         
         # Rename columns if needed:
-        if 'total_points' in player_gw_df.columns and 'points' not in player_gw_df.columns:
-            player_gw_df = player_gw_df.rename(columns={'total_points': 'points'})
-            print("Renamed 'total_points' to 'points'.")
-        if 'mins' in player_gw_df.columns and 'minutes' not in player_gw_df.columns:
-            player_gw_df = player_gw_df.rename(columns={'mins': 'minutes'})
-            print("Renamed 'mins' to 'minutes'.")
-        if 'goals_scored' in player_gw_df.columns and 'goals' not in player_gw_df.columns:
-            player_gw_df = player_gw_df.rename(columns={'goals_scored': 'goals'})
-            print("Renamed 'goals_scored' to 'goals'.")
+        player_gw_df = rename_player_gw_columns(player_gw_df)
         
         # Print columns after renaming
         print("Columns after renaming:", player_gw_df.columns.tolist())
@@ -93,14 +155,13 @@ def process_data() -> Dict[str, Any]:
         # Check if all required columns are present
         if all(col in player_gw_df.columns for col in required_cols):
             # Normalize the feature columns used for sequence creation
-            feature_cols = ['minutes', 'goals', 'assists']
             scaler = StandardScaler()
             player_gw_df[feature_cols] = scaler.fit_transform(player_gw_df[feature_cols])
             print("Normalized feature columns:", feature_cols)
             
-            X, y = create_sequences(player_gw_df, seq_length=5,
+            X, y = create_sequences(player_gw_df, seq_length=seq_length,
                                     feature_cols=feature_cols,
-                                    target_col='points')
+                                    target_col=target_col)
             if X is not None:
                 print("\nLSTM Input Sequences Shape:", X.shape)
                 print("LSTM Target Shape:", y.shape)
@@ -109,47 +170,385 @@ def process_data() -> Dict[str, Any]:
         else:
             missing = [col for col in required_cols if col not in player_gw_df.columns]
             print("player_gw_df is missing required columns for sequence creation:", missing)
-            X, y = None, None
+            X, y, scaler = None, None, None
     else:
         print("No player gameweek data available.")
-        X, y = None, None
+        X, y, scaler = None, None, None
 
     print("\nData processing complete.")
     return {
         "teams_df": teams_df,
         "fixtures_df": fixtures_df,
+        "fixture_stats_df": fixture_stats_df,
         "player_idlist_df": player_idlist_df,
         "playerraw_df": playerraw_df,
         "player_gw_df": player_gw_df,
         "X": X,
-        "y": y
+        "y": y,
+        "scaler": scaler
     }
 
+def _files_under(path: str) -> List[str]:
+    """Every file below the directory `path`."""
+    return [os.path.join(root, name) for root, _, names in os.walk(path) for name in names]
+
+def processing_input_files(player_store: Optional[str] = None,
+                           seasons: Optional[List[str]] = None) -> List[str]:
+    """
+    The files process_data reads for these arguments: the key files and
+    schema of the season its key files come from, and the player gameweek
+    store, or every file in each season's players folder.
+    """
+    base_local_dir = os.path.join("data", seasons[-1]) if seasons else "data"
+    files = [os.path.join(base_local_dir, SCHEMA_FILE)]
+    files += [resolve_csv_path(os.path.join(base_local_dir, name))
+              for name in ("teams.csv", "fixtures.csv", "player_idlist.csv", "playerraw.csv")]
+    if player_store is not None and os.path.exists(player_store):
+        files += _files_under(player_store) if os.path.isdir(player_store) else [player_store]
+    else:
+        for season_dir in [os.path.join("data", season) for season in seasons] if seasons else [base_local_dir]:
+            files.append(os.path.join(season_dir, SCHEMA_FILE))
+            files += _files_under(os.path.join(season_dir, "players"))
+    return sorted(set(path for path in files if path and os.path.isfile(path)))
+
+def feature_cache_key(input_files: List[str], params: Dict[str, Any]) -> str:
+    """SHA-256 of the processing parameters and the path, size and content of every input file."""
+    digest = hashlib.sha256(json.dumps(dict(params, version=FEATURE_CACHE_VERSION),
+                                       sort_keys=True, default=str).encode('utf-8'))
+    for path in input_files:
+        digest.update("{}\0{}\0".format(path, os.path.getsize(path)).encode('utf-8'))
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+def feature_cache_entry_valid(entry_dir: str) -> bool:
+    """True if `entry_dir` holds a complete cache entry (one whose meta.json can be read)."""
+    try:
+        with open(os.path.join(entry_dir, "meta.json"), encoding='utf-8') as f:
+            json.load(f)
+        return True
+    except (OSError, ValueError):
+        return False
+
+def save_feature_cache_entry(entry_dir: str, data: Dict[str, Any], params: Dict[str, Any]) -> None:
+    """
+    Stores a process_data result in `entry_dir`: X and y as .npy files,
+    player_gw_df as Arrow when pyarrow is installed, and the rest with joblib.
+    The entry is written beside it and renamed into place, replacing an
+    incomplete one.
+    """
+    tmp_dir = "{}.tmp-{}".format(entry_dir, os.getpid())
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    X = data["X"]
+    if isinstance(X, SequenceWindows):
+        np.save(os.path.join(tmp_dir, "features.npy"), X.features)
+        np.save(os.path.join(tmp_dir, "starts.npy"), X.starts)
+        x_layout = {"type": "windows", "seq_length": X.seq_length}
+    elif X is not None:
+        np.save(os.path.join(tmp_dir, "X.npy"), np.asarray(X))
+        x_layout = {"type": "array"}
+    else:
+        x_layout = None
+    if data["y"] is not None:
+        np.save(os.path.join(tmp_dir, "y.npy"), data["y"])
+    frames = {name: value for name, value in data.items() if name not in ("X", "y")}
+    player_gw_format = None
+    if frames.get("player_gw_df") is not None:
+        try:
+            frames["player_gw_df"].to_feather(os.path.join(tmp_dir, "player_gw_df.arrow"))
+            frames["player_gw_df"] = None
+            player_gw_format = "arrow"
+        except (ImportError, ValueError):
+            # No pyarrow, or a frame Feather cannot hold (e.g. non-string column names)
+            pass
+    joblib.dump(frames, os.path.join(tmp_dir, "frames.joblib"))
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding='utf-8') as f:
+        json.dump({"params": params, "X": x_layout, "player_gw_df": player_gw_format}, f, indent=1,
+                  default=str)
+    if os.path.exists(entry_dir) and not feature_cache_entry_valid(entry_dir):
+        shutil.rmtree(entry_dir, ignore_errors=True)
+    try:
+        os.rename(tmp_dir, entry_dir)
+    except OSError:
+        # Another run stored the same entry first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def load_feature_cache_entry(entry_dir: str) -> Dict[str, Any]:
+    """
+    The process_data result stored in `entry_dir`. The feature array is
+    memory-mapped rather than read, so a hit costs little more than loading
+    the DataFrames.
+    """
+    with open(os.path.join(entry_dir, "meta.json"), encoding='utf-8') as f:
+        meta = json.load(f)
+    x_layout = meta["X"]
+    data = joblib.load(os.path.join(entry_dir, "frames.joblib"))
+    if meta.get("player_gw_df") == "arrow":
+        data["player_gw_df"] = pd.read_feather(os.path.join(entry_dir, "player_gw_df.arrow"))
+    if x_layout is None:
+        data["X"] = None
+    elif x_layout["type"] == "windows":
+        data["X"] = SequenceWindows(np.load(os.path.join(entry_dir, "features.npy"), mmap_mode='r'),
+                                    np.load(os.path.join(entry_dir, "starts.npy")),
+                                    x_layout["seq_length"])
+    else:
+        data["X"] = np.load(os.path.join(entry_dir, "X.npy"), mmap_mode='r')
+    y_path = os.path.join(entry_dir, "y.npy")
+    data["y"] = np.load(y_path) if os.path.exists(y_path) else None
+    return data
+
+def evict_feature_cache(cache_dir: str = FEATURE_CACHE_DIR, max_bytes: int = FEATURE_CACHE_MAX_BYTES,
+                        keep: Optional[str] = None) -> int:
+    """
+    Removes the least recently used entries of the feature cache (by the
+    modification time of their meta.json, which every hit touches) until
+    the entries total at most `max_bytes`. The entry named `keep` is never
+    removed. Returns the number of entries removed.
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+    entries = []
+    for name in os.listdir(cache_dir):
+        meta_path = os.path.join(cache_dir, name, "meta.json")
+        if ".tmp-" not in name and os.path.exists(meta_path):
+            entry_dir = os.path.join(cache_dir, name)
+            entries.append((os.path.getmtime(meta_path), name,
+                            sum(os.path.getsize(path) for path in _files_under(entry_dir))))
+    total = sum(size for _, _, size in entries)
+    removed = 0
+    for _, name, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if name == keep:
+            continue
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+        total -= size
+        removed += 1
+    if removed:
+        print("Evicted {} feature cache entr{} from '{}'.".format(removed, "y" if removed == 1 else "ies",
+                                                                  cache_dir))
+    return removed
+
+def cached_process_data(cache_dir: str = FEATURE_CACHE_DIR, max_bytes: int = FEATURE_CACHE_MAX_BYTES,
+                        **kwargs: Any) -> Dict[str, Any]:
+    """
+    process_data(**kwargs) behind a cache in `cache_dir`, keyed by the content
+    of every input file and the arguments. Least recently used entries are
+    evicted above `max_bytes`.
+    """
+    arguments = inspect.signature(process_data).bind(**kwargs)
+    arguments.apply_defaults()
+    # The pool size does not change the result
+    params = {name: value for name, value in arguments.arguments.items() if name != "load_workers"}
+    input_files = processing_input_files(params["player_store"], params["seasons"])
+    key = feature_cache_key(input_files, params)
+    entry_dir = os.path.join(cache_dir, key)
+    if os.path.exists(os.path.join(entry_dir, "meta.json")):
+        try:
+            data = load_feature_cache_entry(entry_dir)
+            os.utime(os.path.join(entry_dir, "meta.json"))
+            print("Loaded processed features from cache entry {}.".format(key[:12]))
+            return data
+        except Exception as e:
+            print("Ignoring unreadable feature cache entry '{}': {}".format(entry_dir, e))
+            shutil.rmtree(entry_dir, ignore_errors=True)
+    data = process_data(**kwargs)
+    # On-demand player downloads change the inputs, so key the entry by what was read
+    input_files_after = processing_input_files(params["player_store"], params["seasons"])
+    if input_files_after != input_files:
+        key = feature_cache_key(input_files_after, params)
+        entry_dir = os.path.join(cache_dir, key)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        save_feature_cache_entry(entry_dir, data, params)
+        evict_feature_cache(cache_dir, max_bytes, keep=key)
+    except OSError as e:
+        print("Could not write feature cache entry '{}': {}".format(entry_dir, e))
+    return data
+
+def rename_player_gw_columns(player_gw_df: pd.DataFrame) -> pd.DataFrame:
+    """Renames upstream player gameweek columns to the names the features use (e.g. goals_scored -> goals)."""
+    if 'total_points' in player_gw_df.columns and 'points' not in player_gw_df.columns:
+        player_gw_df = player_gw_df.rename(columns={'total_points': 'points'})
+        print("Renamed 'total_points' to 'points'.")
+    if 'mins' in player_gw_df.columns and 'minutes' not in player_gw_df.columns:
+        player_gw_df = player_gw_df.rename(columns={'mins': 'minutes'})
+        print("Renamed 'mins' to 'minutes'.")
+    if 'goals_scored' in player_gw_df.columns and 'goals' not in player_gw_df.columns:
+        player_gw_df = player_gw_df.rename(columns={'goals_scored': 'goals'})
+        print("Renamed 'goals_scored' to 'goals'.")
+    return player_gw_df
+
+def parse_fixture_stats(fixtures_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turns the nested 'stats' column of fixtures_df into a long table with
+    one row per (fixture_id, identifier, side, element, value) entry, with a
+    single regex scan of each string instead of a literal_eval and a Python
+    walk of the parsed dicts per fixture. Side is 'h' or 'a'; fixtures without stats add no rows.
+    """
+    matches = [FIXTURE_STATS_TOKEN.findall(stats)
+               for stats in fixtures_df['stats'].astype(object).fillna("").astype(str)]
+    row = np.repeat(np.arange(len(matches)), [len(found) for found in matches])
+    tokens = pd.DataFrame(list(itertools.chain.from_iterable(matches)),
+                          columns=['identifier', 'side', 'value', 'element', 'element2', 'value2'])
+    tokens = tokens.where(tokens != "")
+    # Entries belong to the identifier and side that last preceded them in their fixture
+    tokens['identifier'] = tokens['identifier'].groupby(row).ffill()
+    tokens['side'] = tokens['side'].groupby(row).ffill()
+    tokens['value'] = tokens['value'].fillna(tokens['value2'])
+    tokens['element'] = tokens['element'].fillna(tokens['element2'])
+    entries = tokens['value'].notna().to_numpy() & tokens['identifier'].notna().to_numpy() \
+        & tokens['side'].notna().to_numpy()
+    tokens = tokens[entries]
+    return pd.DataFrame({
+        'fixture_id': fixtures_df['id'].to_numpy()[row[entries]].astype('int32'),
+        'identifier': pd.Categorical(tokens['identifier'].to_numpy()),
+        'side': pd.Categorical(tokens['side'].to_numpy(), categories=list(FIXTURE_STAT_SIDES)),
+        'element': tokens['element'].astype('int32').to_numpy(),
+        'value': tokens['value'].astype('int16').to_numpy(),
+    })
+
+def load_fixture_stats(fixtures_df: pd.DataFrame, cache_path: Optional[str] = None) -> pd.DataFrame:
+    """
+    parse_fixture_stats(fixtures_df), cached in the .npz file `cache_path`
+    under a hash of the fixture ids and stats strings: a cache written for
+    the same fixtures is loaded instead of parsing them again, and any
+    change to the stats re-parses and rewrites it.
+    """
+    digest = hashlib.sha256()
+    for fixture_id, stats in zip(fixtures_df['id'].astype(str), fixtures_df['stats'].astype(str)):
+        digest.update("{}\x1f{}\x1e".format(fixture_id, stats).encode('utf-8'))
+    key = digest.hexdigest()
+    if cache_path is not None and os.path.exists(cache_path):
+        try:
+            with np.load(cache_path, allow_pickle=False) as cache:
+                if str(cache['key']) == key:
+                    return pd.DataFrame({
+                        'fixture_id': cache['fixture_id'],
+                        'identifier': pd.Categorical.from_codes(cache['identifier_codes'],
+                                                                cache['identifiers']),
+                        'side': pd.Categorical.from_codes(cache['side_codes'],
+                                                          list(FIXTURE_STAT_SIDES)),
+                        'element': cache['element'],
+                        'value': cache['value'],
+                    })
+        except (OSError, ValueError, KeyError) as e:
+            print("Ignoring unreadable fixture stats cache '{}': {}".format(cache_path, e))
+    stats_df = parse_fixture_stats(fixtures_df)
+    if cache_path is not None:
+        tmp_path = cache_path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, key=np.array(key), fixture_id=stats_df['fixture_id'].to_numpy(),
+                         identifier_codes=stats_df['identifier'].cat.codes.to_numpy(),
+                         identifiers=np.array(stats_df['identifier'].cat.categories, dtype=str),
+                         side_codes=stats_df['side'].cat.codes.to_numpy(),
+                         element=stats_df['element'].to_numpy(), value=stats_df['value'].to_numpy())
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print("Could not write fixture stats cache '{}': {}".format(cache_path, e))
+    return stats_df
+
+def fixture_stat_totals(fixture_stats_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sums the long fixture stats table per fixture, side and identifier in one
+    groupby. Returns a frame indexed by fixture_id with a home_<identifier>
+    and away_<identifier> column per stat (0 where a side had no entries).
+    """
+    totals = fixture_stats_df.groupby(['fixture_id', 'side', 'identifier'], observed=True)['value'].sum()
+    totals = totals.unstack(['side', 'identifier'], fill_value=0)
+    totals.columns = ["{}_{}".format(FIXTURE_STAT_SIDES[side], identifier)
+                      for side, identifier in totals.columns]
+    return totals.sort_index(axis=1).astype('int32')
+
+def add_fixture_stat_totals(fixtures_df: pd.DataFrame, fixture_stats_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    fixtures_df with the fixture_stat_totals columns joined on 'id'; fixtures
+    without stats get 0. home_goals_scored is always present.
+    """
+    totals = fixture_stat_totals(fixture_stats_df)
+    totals.index = totals.index.astype(fixtures_df['id'].dtype)
+    fixtures_df = fixtures_df.drop(columns=[col for col in totals.columns if col in fixtures_df.columns])
+    fixtures_df = fixtures_df.join(totals, on='id')
+    fixtures_df[totals.columns] = fixtures_df[totals.columns].fillna(0).astype('int32')
+    if 'home_goals_scored' not in fixtures_df.columns:
+        fixtures_df['home_goals_scored'] = np.int32(0)
+    return fixtures_df
+
+class SequenceWindows:
+    """
+    Lazy [n_sequences, seq_length, n_features] array of LSTM input windows
+    over one contiguous float32 feature array. Only the windows indexed are
+    copied; materialize() returns the full array.
+    """
+    def __init__(self, features: np.ndarray, starts: np.ndarray, seq_length: int):
+        self.features = features
+        self.starts = starts
+        self.seq_length = seq_length
+        if len(features) >= seq_length:
+            # (rows - seq_length + 1, n_features, seq_length) view, transposed to put time first
+            self._windows = sliding_window_view(features, seq_length, axis=0).transpose(0, 2, 1)
+        else:
+            self._windows = np.empty((0, seq_length, features.shape[1]), dtype=features.dtype)
+        self.shape = (len(starts), seq_length, features.shape[1])
+        self.dtype = features.dtype
+        self.ndim = 3
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            selected = self[index[0]]
+            rest = index[1:]
+            return selected[rest] if np.ndim(self.starts[index[0]]) == 0 else \
+                selected[(slice(None),) + rest]
+        starts = self.starts[index]
+        if np.ndim(starts) == 0:
+            return self._windows[starts]
+        return np.ascontiguousarray(self._windows[starts])
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        array = self.materialize()
+        return array.astype(dtype, copy=False) if dtype is not None else array
+
+    def materialize(self) -> np.ndarray:
+        """All windows as one contiguous array."""
+        return self[:]
+
 def create_sequences(df: pd.DataFrame, seq_length: int = 5, 
                      feature_cols: list = ['minutes', 'goals', 'assists'], 
-                     target_col: str = 'points') -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+                     target_col: str = 'points',
+                     materialize: bool = False) -> Tuple[Optional[Any], Optional[np.ndarray]]:
     """
     Creates sliding-window sequences from player gameweek data.
     Each sequence (shape [seq_length, num_features]) is paired with the target value from the next gameweek.
+    Multi-season data is grouped by season and player. X is a float32 SequenceWindows view
+    (an ndarray with `materialize`) and y float32 targets.
     """
-    sequences = []
-    targets = []
     if df is None:
         return None, None
     if 'gameweek' not in df.columns:
         print("Column 'gameweek' not found in player gameweek data. Cannot create sequences.")
         return None, None
-    df = df.sort_values(['player_id', 'gameweek'])
-    for player in df['player_id'].unique():
-        player_data = df[df['player_id'] == player].reset_index(drop=True)
-        if len(player_data) <= seq_length:
-            continue
-        data_array = player_data[feature_cols].values
-        target_array = player_data[target_col].values
-        for i in range(len(player_data) - seq_length):
-            sequences.append(data_array[i:i+seq_length])
-            targets.append(target_array[i+seq_length])
-    return np.array(sequences), np.array(targets)
+    group_cols = ['season', 'player_id'] if 'season' in df.columns else ['player_id']
+    group_keys = [pd.factorize(df[col], sort=True)[0] for col in group_cols]
+    # lexsort sorts by its last key first
+    order = np.lexsort([df['gameweek'].to_numpy()] + group_keys[::-1])
+    features = np.ascontiguousarray(df[feature_cols].to_numpy(dtype=np.float32)[order])
+    targets = df[target_col].to_numpy(dtype=np.float32)[order]
+    sorted_keys = [keys[order] for keys in group_keys]
+    new_group = np.zeros(len(order), dtype=bool)
+    for keys in sorted_keys:
+        new_group[1:] |= keys[1:] != keys[:-1]
+    group_ids = np.cumsum(new_group)
+    starts = np.flatnonzero(group_ids[:-seq_length] == group_ids[seq_length:]) \
+        if len(order) > seq_length else np.empty(0, dtype=np.int64)
+    X = SequenceWindows(features, starts, seq_length)
+    y = targets[starts + seq_length]
+    return (X.materialize() if materialize else X), y
 
 if __name__ == "__main__":
     process_data()
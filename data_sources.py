@@ -0,0 +1,520 @@
+import io
+import os
+import re
+import time
+import collections
+import random
+import tarfile
+import zipfile
+import threading
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+
+# Returned by DataSource.open when a file is unchanged since the last download
+NOT_MODIFIED = object()
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class DownloadScheduler:
+    """
+    Bounds the number of HTTP requests in flight across every thread that
+    shares it. With `adaptive`, the limit grows by one slot per window of
+    successes and halves when the server throttles, and rate-limit headers
+    pause new requests. status() reports the limit, in-flight requests,
+    backlog and recent rate.
+    """
+    def __init__(self, max_concurrency=8, adaptive=False, min_concurrency=1,
+                 decrease_interval=1.0, rate_window=10.0):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.adaptive = adaptive
+        self.decrease_interval = decrease_interval
+        self.rate_window = rate_window
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.backlog = 0
+        self.paused_until = 0.0
+        self.throttled = 0
+        self._last_decrease = 0.0
+        self._completions = collections.deque()
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            self.backlog += 1
+            while True:
+                wait = self.paused_until - time.time()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    break
+                self._cond.wait(timeout=wait if wait > 0 else None)
+            self.backlog -= 1
+            self.in_flight += 1
+
+    def release(self, response=None):
+        with self._cond:
+            self.in_flight -= 1
+            now = time.time()
+            self._completions.append(now)
+            while self._completions and self._completions[0] < now - self.rate_window:
+                self._completions.popleft()
+            if response is not None:
+                self._observe(response, now)
+            self._cond.notify_all()
+
+    def _observe(self, response, now):
+        if is_throttled(response):
+            self.throttled += 1
+            pause = rate_limit_wait(response)
+            if pause > 0:
+                self.paused_until = max(self.paused_until, now + pause)
+            if self.adaptive and now - self._last_decrease >= self.decrease_interval:
+                self.limit = max(float(self.min_concurrency), self.limit / 2)
+                self._last_decrease = now
+        elif response.status_code < 400:
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                pause = rate_limit_wait(response)
+                self.paused_until = max(self.paused_until, now + pause)
+            if self.adaptive:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+
+    @property
+    def rate(self):
+        """Requests completed per second over the last `rate_window` seconds."""
+        with self._cond:
+            return len(self._completions) / self.rate_window
+
+    def status(self):
+        with self._cond:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "backlog": self.backlog,
+                "rate": len(self._completions) / self.rate_window,
+                "throttled": self.throttled,
+                "paused_for": max(0.0, self.paused_until - time.time()),
+            }
+
+def is_throttled(response):
+    """True for 429 responses and 403 responses carrying rate-limit signals (as GitHub sends)."""
+    if response.status_code == 429:
+        return True
+    return response.status_code == 403 and (
+        "Retry-After" in response.headers or response.headers.get("X-RateLimit-Remaining") == "0")
+
+def rate_limit_wait(response):
+    """Seconds the server asked us to wait, from Retry-After or X-RateLimit-Reset; 0 if none."""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return 0.0
+    if response.headers.get("X-RateLimit-Remaining") == "0":
+        try:
+            return max(0.0, float(response.headers["X-RateLimit-Reset"]) - time.time())
+        except (KeyError, ValueError):
+            return 0.0
+    return 0.0
+
+class HttpClient:
+    """
+    Pooled HTTP session shared by every ingestion fetch, retrying connection
+    errors, 429/5xx and rate-limited 403s with jittered backoff. With a
+    DownloadScheduler, each attempt holds a slot until its response (for
+    stream=True, until the response is closed). Counts are kept in `stats`.
+    """
+    def __init__(self, max_retries=3, backoff_factor=0.5, max_backoff=30.0,
+                 pool_size=10, timeout=30, scheduler=None):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "not_modified": 0}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def last_request(self):
+        """Final HTTP status and retry count of the calling thread's most recent get()."""
+        return getattr(self._local, "last", {"status": None, "retries": 0})
+
+    def _retry_delay(self, attempt, response):
+        """Exponential backoff with full jitter, raised to the server's requested wait if any."""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff_factor * (2 ** attempt)))
+        if response is not None:
+            delay = max(delay, rate_limit_wait(response))
+        return delay
+
+    def get(self, url, **kwargs):
+        """
+        GET `url`, retrying transient failures. Returns the response, or
+        raises the last error once retries are exhausted or the response is
+        a non-retryable HTTP error.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        while True:
+            self._count("requests")
+            response, error = None, None
+            if self.scheduler is not None:
+                self.scheduler.acquire()
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            finally:
+                if self.scheduler is not None:
+                    if (kwargs.get("stream") and response is not None and response.ok
+                            and not is_throttled(response)):
+                        self._release_on_close(response)
+                    else:
+                        self.scheduler.release(response)
+            self._local.last = {"status": response.status_code if response is not None else None,
+                                "retries": attempt}
+            if (response is not None and response.status_code not in RETRY_STATUS_CODES
+                    and not is_throttled(response)):
+                if response.status_code == 304:
+                    self._count("not_modified")
+                elif not response.ok:
+                    self._count("failures")
+                    # Return the (streamed) connection to the pool before raising
+                    response.close()
+                    response.raise_for_status()
+                return response
+            if response is not None:
+                response.close()
+            if attempt >= self.max_retries:
+                self._count("failures")
+                if error is not None:
+                    raise error
+                response.raise_for_status()
+            self._count("retries")
+            time.sleep(self._retry_delay(attempt, response))
+            attempt += 1
+
+    def _release_on_close(self, response):
+        """Releases the scheduler slot of a streamed response when the response is first closed."""
+        close = response.close
+        released = []
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if not released:
+                    released.append(True)
+                    self.scheduler.release(response)
+        response.close = close_and_release
+
+    def close(self):
+        self.session.close()
+
+_default_client = None
+
+def get_default_client():
+    """Return the module-wide HttpClient, creating it on first use."""
+    global _default_client
+    if _default_client is None:
+        _default_client = HttpClient()
+    return _default_client
+
+def conditional_headers(entry):
+    """Build If-None-Match / If-Modified-Since headers from a manifest entry."""
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+class SourceFile:
+    """
+    One file opened from a DataSource: a readable binary stream plus the
+    validators (ETag / Last-Modified) to record in the ingestion manifest.
+    """
+    def __init__(self, fileobj, etag=None, last_modified=None, closer=None):
+        self.fileobj = fileobj
+        self.etag = etag
+        self.last_modified = last_modified
+        self._closer = closer or fileobj.close
+
+    def read(self):
+        return self.fileobj.read()
+
+    def iter_chunks(self, chunk_size=64 * 1024):
+        while True:
+            chunk = self.fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self):
+        self._closer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class DataSource:
+    """
+    A place the upstream season data directory can be read from, by
+    "/"-separated relative path. open() returns a SourceFile, or NOT_MODIFIED
+    when the manifest `entry` is current; list_dir() returns dicts with
+    "name", "type", "url", "sha" and "size" keys.
+    """
+    def __init__(self):
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "not_modified": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def open(self, relative_path, entry=None, url=None):
+        raise NotImplementedError
+
+    def list_dir(self, relative_dir):
+        raise NotImplementedError
+
+    def list_tree(self, relative_dir=""):
+        """
+        Git blob SHA of every file under `relative_dir`, recursively, keyed by
+        path relative to the season directory, from a single listing call.
+        None if the source cannot list blob SHAs.
+        """
+        entries = self.list_tree_entries(relative_dir)
+        if entries is None:
+            return None
+        return {path: entry["sha"] for path, entry in entries.items()}
+
+    def list_tree_entries(self, relative_dir=""):
+        """Like list_tree, but mapping each path to a dict with its "sha" and "size" (bytes)."""
+        return None
+
+    def last_request(self):
+        """Status and retry count of the calling thread's last open(); no-op values off HTTP."""
+        return {"status": None, "retries": 0}
+
+    def close(self):
+        pass
+
+class HttpSource(DataSource):
+    """
+    Upstream files served over HTTP, by default the GitHub raw URLs. The
+    directory listing goes through the GitHub contents API at `api_url`,
+    which is derived from a raw.githubusercontent.com base URL if not given,
+    and recursive blob SHA listings through the matching git trees API.
+    """
+    def __init__(self, base_url, api_url=None, client=None, tree_url=None):
+        super().__init__()
+        self.base_url = base_url if base_url.endswith("/") else base_url + "/"
+        self.api_url = api_url or github_api_url(self.base_url)
+        self.tree_url = tree_url or github_tree_url(self.api_url)
+        self.client = client or get_default_client()
+        self.stats = self.client.stats
+
+    def open(self, relative_path, entry=None, url=None):
+        response = self.client.get(url or self.base_url + relative_path,
+                                   headers=conditional_headers(entry), stream=True)
+        if response.status_code == 304:
+            response.close()
+            return NOT_MODIFIED
+        response.raw.decode_content = True
+        return SourceFile(response.raw, etag=response.headers.get("ETag"),
+                          last_modified=response.headers.get("Last-Modified"),
+                          closer=response.close)
+
+    def list_dir(self, relative_dir):
+        if self.api_url is None:
+            raise ValueError("No directory listing API configured for {}".format(self.base_url))
+        response = self.client.get(self.api_url.rstrip("/") + "/" + relative_dir)
+        return parse_contents_listing(response.json())
+
+    def list_tree_entries(self, relative_dir=""):
+        if self.tree_url is None:
+            return None
+        response = self.client.get(tree_listing_url(self.tree_url, relative_dir),
+                                   params={"recursive": "1"})
+        return parse_tree_listing(response.json(), relative_dir)
+
+    def last_request(self):
+        return self.client.last_request()
+
+    def close(self):
+        self.client.close()
+
+def github_api_url(raw_url):
+    """Map a raw.githubusercontent.com directory URL to its GitHub contents API URL, or None."""
+    match = re.match(r"https://raw\.githubusercontent\.com/([^/]+)/([^/]+)/([^/]+)/(.*)$", raw_url)
+    if not match:
+        return None
+    owner, repo, ref, path = match.groups()
+    if ref != "master":
+        return None
+    return "https://api.github.com/repos/{}/{}/contents/{}".format(owner, repo, path)
+
+def github_tree_url(api_url):
+    """
+    Map a GitHub contents API directory URL to the git trees API URL of the
+    same directory on master (as "master:<path>"), or None.
+    """
+    match = re.match(r"(https?://.+)/repos/([^/]+)/([^/]+)/contents/(.*)$", api_url or "")
+    if not match:
+        return None
+    host, owner, repo, path = match.groups()
+    return "{}/repos/{}/{}/git/trees/master:{}".format(host, owner, repo, path.strip("/"))
+
+def tree_listing_url(tree_url, relative_dir=""):
+    """Git trees API URL of `relative_dir` below the directory at `tree_url`."""
+    relative_dir = relative_dir.strip("/")
+    return tree_url.rstrip("/") + ("/" + relative_dir if relative_dir else "")
+
+def parse_contents_listing(items):
+    """DataSource.list_dir entries from a GitHub contents API response body."""
+    return [{"name": item.get("name"), "type": item.get("type"),
+             "url": item.get("download_url"), "sha": item.get("sha"), "size": item.get("size")}
+            for item in items]
+
+def parse_tree_listing(listing, relative_dir=""):
+    """DataSource.list_tree_entries mapping from a recursive git trees API response body, or None."""
+    if listing.get("truncated"):
+        # GitHub caps recursive listings; a partial one cannot say what is unchanged
+        print("Tree listing of '{}' was truncated; ignoring it.".format(relative_dir))
+        return None
+    prefix = relative_dir.strip("/") + "/" if relative_dir.strip("/") else ""
+    return {prefix + item["path"]: {"sha": item["sha"], "size": item.get("size")}
+            for item in listing.get("tree", []) if item.get("type") == "blob"}
+
+class LocalDirectorySource(DataSource):
+    """
+    A local mirror of the season data directory, e.g. data/2024-25 in a
+    clone of the Fantasy-Premier-League repository. A file's size and
+    modification time stand in for its Last-Modified validator.
+    """
+    def __init__(self, root):
+        super().__init__()
+        self.root = root
+
+    def open(self, relative_path, entry=None, url=None):
+        self._count("requests")
+        path = os.path.join(self.root, *relative_path.split("/"))
+        try:
+            stat = os.stat(path)
+            last_modified = "{}:{}".format(stat.st_mtime_ns, stat.st_size)
+            if entry and entry.get("last_modified") == last_modified:
+                self._count("not_modified")
+                return NOT_MODIFIED
+            return SourceFile(open(path, "rb"), last_modified=last_modified)
+        except OSError:
+            self._count("failures")
+            raise
+
+    def list_dir(self, relative_dir):
+        path = os.path.join(self.root, *relative_dir.split("/"))
+        listing = []
+        for name in sorted(os.listdir(path)):
+            is_dir = os.path.isdir(os.path.join(path, name))
+            listing.append({"name": name, "url": None, "sha": None,
+                            "type": "dir" if is_dir else "file",
+                            "size": None if is_dir else os.path.getsize(os.path.join(path, name))})
+        return listing
+
+class ArchiveSource(DataSource):
+    """
+    A .zip or .tar(.gz/.bz2/.xz) archive of the repository, read in place.
+    `prefix` is the season directory inside it (by default the one holding
+    player_idlist.csv, named `season` if given). A compressed tarball is read
+    in one pass on first open(), keeping the season's files in memory.
+    """
+    def __init__(self, path, prefix=None, season=None):
+        super().__init__()
+        self.path = path
+        if zipfile.is_zipfile(path):
+            self._zip = zipfile.ZipFile(path)
+            self._tar = None
+            self._members = {info.filename: info for info in self._zip.infolist() if not info.is_dir()}
+        else:
+            self._zip = None
+            self._tar = tarfile.open(path)
+            self._members = {info.name: info for info in self._tar.getmembers() if info.isfile()}
+            self._compressed = not isinstance(self._tar.fileobj, io.BufferedReader)
+        self._season_files = None
+        if prefix is None:
+            marker = "{}/player_idlist.csv".format(season) if season else "player_idlist.csv"
+            candidates = [name for name in self._members
+                          if name == marker or name.endswith("/" + marker)]
+            if len(candidates) != 1:
+                raise ValueError("Cannot locate the season directory in '{}'; pass prefix "
+                                 "explicitly ({} candidates found).".format(path, len(candidates)))
+            prefix = os.path.dirname(candidates[0])
+        self.prefix = prefix.strip("/")
+        self._read_lock = threading.Lock()
+
+    def _member_name(self, relative_path):
+        return self.prefix + "/" + relative_path if self.prefix else relative_path
+
+    def open(self, relative_path, entry=None, url=None):
+        self._count("requests")
+        info = self._members.get(self._member_name(relative_path))
+        if info is None:
+            self._count("failures")
+            raise FileNotFoundError("'{}' not found in archive '{}'".format(relative_path, self.path))
+        if self._zip is not None:
+            last_modified = "{}:{}".format("-".join(map(str, info.date_time)), info.file_size)
+        else:
+            last_modified = "{}:{}".format(info.mtime, info.size)
+        if entry and entry.get("last_modified") == last_modified:
+            self._count("not_modified")
+            return NOT_MODIFIED
+        # Archive members share one underlying file handle, so reads are serialized
+        with self._read_lock:
+            if self._zip is not None:
+                data = self._zip.read(info)
+            elif self._compressed:
+                if self._season_files is None:
+                    self._season_files = self._read_season_files()
+                data = self._season_files[info.name]
+            else:
+                data = self._tar.extractfile(info).read()
+        return SourceFile(io.BytesIO(data), last_modified=last_modified)
+
+    def _read_season_files(self):
+        """Contents of every file under the season directory, from one sequential pass over the archive."""
+        base = self.prefix + "/" if self.prefix else ""
+        files = {}
+        with tarfile.open(self.path, mode="r|*") as stream:
+            for info in stream:
+                if info.isfile() and info.name.startswith(base):
+                    files[info.name] = stream.extractfile(info).read()
+        return files
+
+    def list_dir(self, relative_dir):
+        base = self._member_name(relative_dir).rstrip("/") + "/"
+        entries = {}
+        for name in self._members:
+            if name.startswith(base):
+                child, _, rest = name[len(base):].partition("/")
+                entries[child] = "dir" if rest else "file"
+        return [{"name": name, "type": kind, "url": None, "sha": None, "size": None}
+                for name, kind in sorted(entries.items())]
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+        else:
+            self._tar.close()
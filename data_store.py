@@ -0,0 +1,584 @@
+import os
+import gzip
+import json
+import time
+import shutil
+import fnmatch
+import sqlite3
+import contextlib
+import pandas as pd
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+
+# Default location of the consolidated player gameweek dataset
+PLAYER_GW_STORE = os.path.join("data", "player_gw_store")
+
+# Name of the schema file ingestion writes next to each season's data
+SCHEMA_FILE = "schema.json"
+
+# Bumped whenever a declared dtype changes, so stored schemas can be told apart
+SCHEMA_VERSION = 1
+
+# Declared schema of each ingested file, keyed by a pattern matching its path
+# relative to the season directory: the columns it must have and compact
+# dtypes for known columns. Other columns keep the dtypes pandas infers.
+# Counts that can be missing upstream (unplayed fixtures) are float32.
+FILE_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    'teams.csv': {
+        'required': ['id', 'name', 'short_name'],
+        'dtypes': {'id': 'int16', 'code': 'int32', 'name': 'category', 'short_name': 'category',
+                   'strength': 'int16', 'strength_overall_home': 'int16',
+                   'strength_overall_away': 'int16', 'strength_attack_home': 'int16',
+                   'strength_attack_away': 'int16', 'strength_defence_home': 'int16',
+                   'strength_defence_away': 'int16'},
+    },
+    'fixtures.csv': {
+        'required': ['id', 'event', 'team_h', 'team_a'],
+        'dtypes': {'id': 'int16', 'code': 'int32', 'event': 'float32', 'finished': 'bool',
+                   'kickoff_time': 'datetime64[ns, UTC]', 'team_h': 'int16', 'team_a': 'int16',
+                   'team_h_score': 'float32', 'team_a_score': 'float32',
+                   'team_h_difficulty': 'int16', 'team_a_difficulty': 'int16'},
+    },
+    'player_idlist.csv': {
+        'required': ['first_name', 'second_name', 'id'],
+        'dtypes': {'id': 'int32'},
+    },
+    'players_raw.csv': {
+        'required': ['id', 'element_type', 'team'],
+        'dtypes': {'id': 'int32', 'code': 'int32', 'element_type': 'int16', 'team': 'int16',
+                   'team_code': 'int16', 'now_cost': 'int16', 'total_points': 'int16',
+                   'minutes': 'int16', 'status': 'category', 'selected_by_percent': 'float32',
+                   'form': 'float32', 'points_per_game': 'float32'},
+    },
+    'players/*/gw.csv': {
+        'required': ['element', 'round', 'minutes', 'total_points'],
+        'dtypes': {'player_id': 'int32', 'gameweek': 'int16', 'element': 'int32',
+                   'fixture': 'int32', 'opponent_team': 'int16', 'total_points': 'int16',
+                   'was_home': 'bool', 'kickoff_time': 'datetime64[ns, UTC]',
+                   'team_h_score': 'float32', 'team_a_score': 'float32', 'round': 'int16',
+                   'minutes': 'int16', 'goals_scored': 'int16', 'assists': 'int16',
+                   'clean_sheets': 'int16', 'goals_conceded': 'int16', 'own_goals': 'int16',
+                   'penalties_saved': 'int16', 'penalties_missed': 'int16',
+                   'yellow_cards': 'int16', 'red_cards': 'int16', 'saves': 'int16',
+                   'bonus': 'int16', 'bps': 'int16', 'influence': 'float32',
+                   'creativity': 'float32', 'threat': 'float32', 'ict_index': 'float32',
+                   'starts': 'int16', 'expected_goals': 'float32', 'expected_assists': 'float32',
+                   'expected_goal_involvements': 'float32',
+                   'expected_goals_conceded': 'float32', 'value': 'int16',
+                   'transfers_balance': 'int32', 'selected': 'int32', 'transfers_in': 'int32',
+                   'transfers_out': 'int32', 'xP': 'float32', 'name': 'category',
+                   'position': 'category', 'team': 'category'},
+    },
+}
+FILE_SCHEMAS['gws/merged_gw.csv'] = FILE_SCHEMAS['players/*/gw.csv']
+
+# File suffix and compression level of each supported CSV codec
+CSV_COMPRESSION: Dict[str, Dict[str, Any]] = {
+    'gzip': {'suffix': '.gz', 'level': 6},
+    'zstd': {'suffix': '.zst', 'level': 3},
+}
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd compression requires zstandard (pip install zstandard).") from e
+    return zstandard
+
+def compressed_path(path: str, compression: Optional[str] = None) -> str:
+    """Path a CSV at `path` is saved under with `compression` (None, "gzip" or "zstd")."""
+    if compression is None:
+        return path
+    if compression not in CSV_COMPRESSION:
+        raise ValueError("Unknown compression: {}".format(compression))
+    if compression == 'zstd':
+        _zstandard()
+    return path + CSV_COMPRESSION[compression]['suffix']
+
+def csv_variants(path: str) -> List[str]:
+    """`path` and its compressed variants, plain CSV first."""
+    return [path] + [path + codec['suffix'] for codec in CSV_COMPRESSION.values()]
+
+def resolve_csv_path(path: str) -> Optional[str]:
+    """
+    The existing file among `path` (e.g. data/teams.csv) and its compressed
+    variants (teams.csv.gz, teams.csv.zst), or None if there is none.
+    """
+    for variant in csv_variants(path):
+        if os.path.exists(variant):
+            return variant
+    return None
+
+def read_local_csv(path: str, schema: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+    """
+    Reads the CSV at `path` or, if only a compressed copy was saved, that
+    copy (pandas infers the codec from the suffix), with the compact dtypes
+    of `schema` if given. Returns None if neither exists.
+    """
+    resolved = resolve_csv_path(path)
+    return read_csv_with_schema(resolved, schema) if resolved is not None else None
+
+def path_compression(path: str) -> Optional[str]:
+    """Codec ("gzip", "zstd" or None) a CSV saved at `path` uses, judged by its suffix."""
+    for name, codec in CSV_COMPRESSION.items():
+        if path.endswith(codec['suffix']):
+            return name
+    return None
+
+class _GzipWriter(gzip.GzipFile):
+    """
+    GzipFile that owns its output file but leaves the file name and mtime
+    out of the header, so the same CSV always compresses to the same bytes
+    whatever temporary name it is written under.
+    """
+    def __init__(self, path: str, compresslevel: int):
+        super().__init__(filename="", mode="wb", compresslevel=compresslevel,
+                         fileobj=open(path, "wb"), mtime=0)
+        self._output = self.fileobj
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            self._output.close()
+
+def open_compressed_writer(path: str, compression: Optional[str] = None):
+    """Opens `path` for writing bytes, compressed with `compression` (None for a plain file)."""
+    if compression == 'gzip':
+        return _GzipWriter(path, CSV_COMPRESSION['gzip']['level'])
+    if compression == 'zstd':
+        compressor = _zstandard().ZstdCompressor(level=CSV_COMPRESSION['zstd']['level'])
+        return compressor.stream_writer(open(path, "wb"), closefd=True)
+    return open(path, "wb")
+
+def remove_other_variants(path: str) -> None:
+    """Deletes stale copies of the CSV saved at `path` under another codec's suffix."""
+    compression = path_compression(path)
+    base = path[:-len(CSV_COMPRESSION[compression]['suffix'])] if compression else path
+    for variant in csv_variants(base):
+        if variant != path and os.path.exists(variant):
+            os.remove(variant)
+
+def schema_for(relative_path: str,
+               schemas: Optional[Dict[str, Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
+    """The schema in `schemas` (FILE_SCHEMAS by default) whose pattern matches `relative_path`."""
+    for pattern, schema in (schemas or FILE_SCHEMAS).items():
+        if fnmatch.fnmatchcase(relative_path, pattern):
+            return schema
+    return None
+
+def _is_int_dtype(dtype: str) -> bool:
+    return dtype.startswith('int')
+
+def validate_schema(df: pd.DataFrame, schema: Dict[str, Any]) -> List[str]:
+    """
+    Checks a parsed file against its schema and returns a list of problems:
+    missing required columns, and values that do not fit a declared numeric
+    dtype (not numeric, missing from an integer column, or out of range).
+    """
+    problems = ["missing column '{}'".format(col)
+                for col in schema.get('required', []) if col not in df.columns]
+    for col, dtype in schema.get('dtypes', {}).items():
+        if col not in df.columns or not (_is_int_dtype(dtype) or dtype.startswith('float')):
+            continue
+        values = pd.to_numeric(df[col], errors='coerce')
+        if (values.isna() & df[col].notna()).any():
+            problems.append("non-numeric values in '{}'".format(col))
+        elif _is_int_dtype(dtype):
+            info = np.iinfo(dtype)
+            if values.isna().any():
+                problems.append("missing values in integer column '{}'".format(col))
+            elif len(values) and (values.min() < info.min or values.max() > info.max):
+                problems.append("values of '{}' out of {} range".format(col, dtype))
+    return problems
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Casts the columns of `df` that the schema declares to their compact
+    dtypes, in place. Integer columns with missing values become float32;
+    values that cannot be cast leave the column as it is.
+    """
+    for col, dtype in schema.get('dtypes', {}).items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        try:
+            if dtype.startswith('datetime'):
+                df[col] = pd.to_datetime(df[col], utc=True, errors='coerce')
+            elif dtype in ('category', 'bool'):
+                if dtype == 'bool' and df[col].isna().any():
+                    continue
+                df[col] = df[col].astype(dtype)
+            else:
+                values = pd.to_numeric(df[col])
+                if _is_int_dtype(dtype) and values.isna().any():
+                    dtype = 'float32'
+                if _is_int_dtype(dtype) and len(values) and (
+                        values.min() < np.iinfo(dtype).min or values.max() > np.iinfo(dtype).max):
+                    continue
+                df[col] = values.astype(dtype)
+        except (ValueError, TypeError):
+            continue
+    return df
+
+def _parser_dtypes(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """The schema's dtypes as dtype objects read_csv can use directly (dates are cast afterwards)."""
+    return {col: pd.CategoricalDtype() if dtype == 'category' else np.dtype(dtype)
+            for col, dtype in schema.get('dtypes', {}).items() if not dtype.startswith('datetime')}
+
+def read_csv_with_schema(path: str, schema: Optional[Dict[str, Any]],
+                         cast: bool = True) -> pd.DataFrame:
+    """
+    Reads a CSV with the schema's dtypes given to the parser up front, so
+    columns are not inferred from text first. If a file does not fit (e.g. an
+    integer column with blanks), it is read untyped and, with `cast`, cast
+    column by column. Pass cast=False when the caller applies the schema
+    once to many concatenated files.
+    """
+    if not schema:
+        return pd.read_csv(path)
+    try:
+        df = pd.read_csv(path, dtype=_parser_dtypes(schema))
+    except (ValueError, TypeError):
+        df = pd.read_csv(path)
+    return apply_schema(df, schema) if cast else df
+
+def write_schema(base_local_dir: str,
+                 schemas: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+    """Stores `schemas` (FILE_SCHEMAS by default) as <base_local_dir>/schema.json."""
+    path = os.path.join(base_local_dir, SCHEMA_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding='utf-8') as f:
+        json.dump({"version": SCHEMA_VERSION, "files": schemas or FILE_SCHEMAS}, f, indent=1)
+    os.replace(tmp_path, path)
+    return path
+
+def load_schema(base_local_dir: str) -> Dict[str, Dict[str, Any]]:
+    """
+    The file schemas stored with the data in `base_local_dir` by ingestion,
+    or FILE_SCHEMAS if there is no (readable) schema.json.
+    """
+    path = os.path.join(base_local_dir, SCHEMA_FILE)
+    if os.path.exists(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)["files"]
+        except (OSError, ValueError, KeyError) as e:
+            print("Ignoring unreadable schema '{}': {}".format(path, e))
+    return FILE_SCHEMAS
+
+def load_player_gw_file(gw_file: str, folder_name: str, schema: Optional[Dict[str, Any]] = None,
+                        cast: bool = True) -> pd.DataFrame:
+    """
+    Loads one player's gw.csv (or compressed gw.csv.gz/.zst), with the
+    compact dtypes of `schema` if given. Files saved by raw ingestion are
+    byte copies of the upstream file, so the player_id (the ID suffix of the
+    folder name) and gameweek (row order) columns are added here when they
+    are missing.
+    """
+    df = read_csv_with_schema(gw_file, schema, cast=False)
+    if 'player_id' not in df.columns:
+        df['player_id'] = int(folder_name.rsplit('_', 1)[-1])
+    if 'gameweek' not in df.columns:
+        df.insert(0, 'gameweek', np.arange(1, len(df) + 1))
+    return apply_schema(df, schema) if schema and cast else df
+
+def player_gw_files(players_local_dir: str) -> List[Tuple[str, str]]:
+    """(gw.csv path, folder name) of every player folder in `players_local_dir` that holds a gw.csv."""
+    files = []
+    for folder in os.listdir(players_local_dir):
+        folder_path = os.path.join(players_local_dir, folder)
+        if os.path.isdir(folder_path):
+            gw_file = resolve_csv_path(os.path.join(folder_path, "gw.csv"))
+            if gw_file is not None:
+                files.append((gw_file, folder))
+    return files
+
+def _load_player_gw_chunk(files: List[Tuple[str, str]],
+                          schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Process pool task of load_player_gw_dir: loads a batch of player files
+    and returns their rows as one typed array per column (numpy arrays, or
+    Categorical/datetime arrays), which pickle far smaller and faster than
+    a DataFrame per file.
+    """
+    chunk_df = pd.concat([load_player_gw_file(gw_file, folder, schema, cast=False)
+                          for gw_file, folder in files], ignore_index=True)
+    return {col: chunk_df[col].array if isinstance(chunk_df[col].dtype, pd.api.extensions.ExtensionDtype)
+            else chunk_df[col].to_numpy() for col in chunk_df.columns}
+
+def load_player_gw_dir(players_local_dir: str,
+                       schema: Optional[Dict[str, Any]] = None,
+                       workers: int = 1, chunk_size: int = 64) -> Optional[pd.DataFrame]:
+    """
+    Reads every <players_local_dir>/<folder>/gw.csv, compressed or not, and
+    concatenates them with the dtypes of `schema` if given; None if there are
+    none. With `workers` > 1 the files are parsed in a process pool, in
+    batches of `chunk_size`, giving the same DataFrame as the serial read.
+    """
+    if not os.path.exists(players_local_dir):
+        return None
+    files = player_gw_files(players_local_dir)
+    if not files:
+        return None
+    if workers > 1 and len(files) > chunk_size:
+        chunks = [files[i:i + chunk_size] for i in range(0, len(files), chunk_size)]
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            player_gw_dfs = [pd.DataFrame(columns) for columns in
+                             executor.map(_load_player_gw_chunk, chunks, [schema] * len(chunks))]
+    else:
+        player_gw_dfs = [load_player_gw_file(gw_file, folder, schema, cast=False)
+                         for gw_file, folder in files]
+    player_gw_df = pd.concat(player_gw_dfs, ignore_index=True)
+    # Cast once after concatenation, which also re-unifies categories that differ between files
+    return apply_schema(player_gw_df, schema) if schema else player_gw_df
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+    except ImportError as e:
+        raise ImportError("The columnar player store requires pyarrow (pip install pyarrow).") from e
+    return pyarrow
+
+def _partitioning(pa):
+    return pa.dataset.partitioning(
+        pa.schema([("season", pa.string()), ("gameweek", pa.int16())]), flavor="hive")
+
+def apply_player_gw_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Casts player gameweek columns to the compact dtypes of the players/*/gw.csv schema."""
+    return apply_schema(df, FILE_SCHEMAS['players/*/gw.csv'])
+
+def write_player_gw_store(player_gw_df: pd.DataFrame, season: str,
+                          path: str = PLAYER_GW_STORE, format: str = "parquet") -> str:
+    """
+    Writes one season of player gameweek rows to a columnar dataset at `path`,
+    hive-partitioned as season=<season>/gameweek=<n>/. `format` is "parquet"
+    or "arrow" (Arrow IPC). The season's previous partitions are replaced.
+    """
+    pa = _pyarrow()
+    df = apply_player_gw_dtypes(player_gw_df.copy())
+    df['season'] = season
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    season_dir = os.path.join(path, f"season={season}")
+    if os.path.exists(season_dir):
+        shutil.rmtree(season_dir)
+    pa.dataset.write_dataset(
+        table, path, format="ipc" if format == "arrow" else format,
+        partitioning=_partitioning(pa), existing_data_behavior="overwrite_or_ignore",
+        basename_template="part-{i}." + ("arrow" if format == "arrow" else "parquet"))
+    print("Saved {} player gameweek rows for {} to {}".format(len(df), season, path))
+    return path
+
+def append_player_gw_store(player_gw_df: pd.DataFrame, season: str,
+                           path: str = PLAYER_GW_STORE, format: str = "parquet") -> str:
+    """
+    Adds new player gameweek rows (e.g. those of the latest gameweek) to the
+    season's partitions of the dataset at `path` as new files, leaving the
+    existing ones untouched. The rows are cast to the dataset's schema so it
+    still reads as one table. Use write_player_gw_store for a new season.
+    """
+    pa = _pyarrow()
+    file_format = "ipc" if format == "arrow" else format
+    schema = pa.dataset.dataset(path, format=file_format, partitioning=_partitioning(pa)).schema
+    df = apply_player_gw_dtypes(player_gw_df.copy())
+    df['season'] = season
+    df = df.reindex(columns=schema.names)
+    table = pa.Table.from_pandas(df, preserve_index=False).cast(schema)
+    extension = "arrow" if format == "arrow" else "parquet"
+    pa.dataset.write_dataset(
+        table, path, format=file_format, partitioning=_partitioning(pa),
+        existing_data_behavior="overwrite_or_ignore",
+        basename_template="append-{}-{{i}}.{}".format(time.time_ns(), extension))
+    print("Appended {} player gameweek rows for {} to {}".format(len(df), season, path))
+    return path
+
+def read_player_gw_store(path: str = PLAYER_GW_STORE, columns: Optional[List[str]] = None,
+                         seasons: Optional[List[str]] = None,
+                         format: str = "parquet",
+                         player_ids: Optional[List[int]] = None) -> Optional[pd.DataFrame]:
+    """
+    Reads the player gameweek dataset in one vectorized scan, loading only
+    `columns` (all if None) for the given `seasons` and `player_ids` (all if
+    None). The partition columns season and gameweek are always included.
+    Rows are returned sorted by season, player_id and gameweek.
+    """
+    if not os.path.exists(path):
+        return None
+    pa = _pyarrow()
+    dataset = pa.dataset.dataset(path, format="ipc" if format == "arrow" else format,
+                                 partitioning=_partitioning(pa))
+    if columns is not None:
+        columns = list(dict.fromkeys(['season', 'player_id', 'gameweek'] + list(columns)))
+    row_filter = pa.dataset.field('season').isin(seasons) if seasons else None
+    if player_ids is not None:
+        player_filter = pa.dataset.field('player_id').isin([int(p) for p in player_ids])
+        row_filter = player_filter if row_filter is None else row_filter & player_filter
+    df = dataset.to_table(columns=columns, filter=row_filter).to_pandas()
+    sort_cols = [c for c in ['season', 'player_id', 'gameweek'] if c in df.columns]
+    return df.sort_values(sort_cols, kind='stable').reset_index(drop=True)
+
+# Default location of the embedded SQLite database written by ingest_data(store="sqlite")
+SQLITE_STORE = os.path.join("data", "fpl.sqlite")
+
+# Season files loaded into the SQLite store, keyed by file name, with their table names
+SQLITE_TABLES: Dict[str, str] = {
+    'teams.csv': 'teams',
+    'fixtures.csv': 'fixtures',
+    'player_idlist.csv': 'player_idlist',
+    'players_raw.csv': 'players_raw',
+}
+
+# Indexed columns of each table in the SQLite store, in index order
+SQLITE_INDEXES: Dict[str, List[str]] = {
+    'player_gw': ['player_id', 'gameweek'],
+    'players_raw': ['team'],
+    'teams': ['id'],
+    'fixtures': ['event'],
+    'understat_team': ['team'],
+}
+
+def _sqlite_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute('PRAGMA table_info("{}")'.format(table))]
+
+def _sqlite_insert(conn: sqlite3.Connection, table: str, df: pd.DataFrame) -> None:
+    """Appends `df` to `table`, creating it or adding any columns it lacks first."""
+    existing = _sqlite_columns(conn, table)
+    for col in df.columns:
+        if existing and col not in existing:
+            conn.execute('ALTER TABLE "{}" ADD COLUMN "{}"'.format(table, col))
+    df.to_sql(table, conn, if_exists='append', index=False, chunksize=10000)
+
+def _sqlite_replace_season(conn: sqlite3.Connection, table: str, df: pd.DataFrame,
+                           season: str) -> None:
+    """Replaces the season's rows of `table` with `df`, which gets a season column."""
+    df = df.copy()
+    df['season'] = season
+    if _sqlite_columns(conn, table):
+        conn.execute('DELETE FROM "{}" WHERE season = ?'.format(table), (season,))
+    _sqlite_insert(conn, table, df)
+
+def _sqlite_create_indexes(conn: sqlite3.Connection) -> None:
+    for table, columns in SQLITE_INDEXES.items():
+        if _sqlite_columns(conn, table):
+            conn.execute('CREATE INDEX IF NOT EXISTS "idx_{}_{}" ON "{}" ({})'.format(
+                table, "_".join(columns), table, ", ".join('"{}"'.format(c) for c in columns)))
+    conn.execute('ANALYZE')
+
+def write_sqlite_store(season_dir: str, season: str, path: str = SQLITE_STORE,
+                       player_gw_df: Optional[pd.DataFrame] = None,
+                       include_player_gw: bool = True) -> str:
+    """
+    Loads one season's key files, Understat tables and player gameweek rows
+    (`player_gw_df`, or the season's players directory) into the SQLite
+    database at `path`, replacing the season's previous rows and indexing
+    SQLITE_INDEXES. include_player_gw=False leaves player_gw as it is.
+    """
+    schemas = load_schema(season_dir)
+    if player_gw_df is None and include_player_gw:
+        player_gw_df = load_player_gw_dir(os.path.join(season_dir, "players"),
+                                          schemas.get("players/*/gw.csv"))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with contextlib.closing(sqlite3.connect(path)) as conn, conn:
+        for file_name, table in SQLITE_TABLES.items():
+            df = read_local_csv(os.path.join(season_dir, file_name), schema_for(file_name, schemas))
+            if df is not None:
+                _sqlite_replace_season(conn, table, df, season)
+        understat_dir = os.path.join(season_dir, "understat")
+        understat_teams = []
+        for file_name in sorted(os.listdir(understat_dir)) if os.path.isdir(understat_dir) else []:
+            name = file_name.split(".csv")[0]
+            df = read_local_csv(os.path.join(understat_dir, name + ".csv"))
+            if df is None or not name.startswith("understat_"):
+                continue
+            if name == "understat_player":
+                _sqlite_replace_season(conn, "understat_player", df, season)
+            else:
+                df.insert(0, 'team', name[len("understat_"):])
+                understat_teams.append(df)
+        if understat_teams:
+            _sqlite_replace_season(conn, "understat_team", pd.concat(understat_teams, ignore_index=True),
+                                   season)
+        if player_gw_df is not None and include_player_gw:
+            _sqlite_replace_season(conn, "player_gw", player_gw_df, season)
+        _sqlite_create_indexes(conn)
+    print("Saved season {} to {}".format(season, path))
+    return path
+
+def append_sqlite_player_gw(player_gw_df: pd.DataFrame, season: str,
+                            path: str = SQLITE_STORE) -> str:
+    """Inserts new player gameweek rows (e.g. the latest gameweek) of a season into the SQLite store."""
+    df = apply_player_gw_dtypes(player_gw_df.copy())
+    df['season'] = season
+    with contextlib.closing(sqlite3.connect(path)) as conn, conn:
+        _sqlite_insert(conn, "player_gw", df)
+    print("Appended {} player gameweek rows for {} to {}".format(len(df), season, path))
+    return path
+
+def sqlite_store_seasons(path: str = SQLITE_STORE) -> List[str]:
+    """Seasons with player gameweek rows in the SQLite store at `path`."""
+    if not os.path.exists(path):
+        return []
+    with contextlib.closing(sqlite3.connect(path)) as conn:
+        if not _sqlite_columns(conn, "player_gw"):
+            return []
+        return [row[0] for row in conn.execute('SELECT DISTINCT season FROM player_gw')]
+
+def query_sqlite_store(sql: str, params: Any = (), path: str = SQLITE_STORE,
+                       schema: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """Runs a query against the SQLite store and returns the rows, cast to `schema` if given."""
+    with contextlib.closing(sqlite3.connect(path)) as conn:
+        df = pd.read_sql_query(sql, conn, params=params)
+    return apply_schema(df, schema) if schema else df
+
+def read_sqlite_table(table: str, path: str = SQLITE_STORE, columns: Optional[List[str]] = None,
+                      seasons: Optional[List[str]] = None, where: Optional[str] = None,
+                      params: Any = ()) -> Optional[pd.DataFrame]:
+    """
+    Reads `columns` (all if None) of the rows of a store table for the given
+    `seasons` (all if None) and an optional SQL `where` condition with
+    `params`, cast to the schema of the file the table comes from. None if
+    the store or table does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    with contextlib.closing(sqlite3.connect(path)) as conn:
+        existing = _sqlite_columns(conn, table)
+    if not existing:
+        return None
+    conditions, values = [], []
+    if seasons:
+        conditions.append("season IN ({})".format(", ".join("?" * len(seasons))))
+        values += list(seasons)
+    if where:
+        conditions.append("({})".format(where))
+        values += list(params)
+    sql = 'SELECT {} FROM "{}"'.format(
+        ", ".join('"{}"'.format(c) for c in columns if c in existing) if columns else "*", table)
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    file_name = {v: k for k, v in SQLITE_TABLES.items()}.get(table)
+    schema = FILE_SCHEMAS['players/*/gw.csv'] if table == 'player_gw' else \
+        schema_for(file_name) if file_name else None
+    return query_sqlite_store(sql, values, path, schema)
+
+def read_player_gw_sqlite(path: str = SQLITE_STORE, columns: Optional[List[str]] = None,
+                          seasons: Optional[List[str]] = None,
+                          player_ids: Optional[List[int]] = None) -> Optional[pd.DataFrame]:
+    """
+    Like read_player_gw_store, for the SQLite store: reads only `columns`
+    of the given `seasons` and `player_ids` (all if None), looking players
+    up through the (player_id, gameweek) index. Rows are returned sorted by
+    season, player_id and gameweek.
+    """
+    if columns is not None:
+        columns = list(dict.fromkeys(['season', 'player_id', 'gameweek'] + list(columns)))
+    where, params = None, ()
+    if player_ids is not None:
+        params = [int(p) for p in player_ids]
+        where = "player_id IN ({})".format(", ".join("?" * len(params))) if params else "0"
+    df = read_sqlite_table('player_gw', path, columns, seasons, where, params)
+    if df is None:
+        return None
+    sort_cols = [c for c in ['season', 'player_id', 'gameweek'] if c in df.columns]
+    return df.sort_values(sort_cols, kind='stable').reset_index(drop=True)
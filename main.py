@@ -1,10 +1,13 @@
 import os
+import asyncio
 import logging
 import pandas as pd
 import numpy as np
 import plotly.express as px
-from data_ingestion import ingest_data
-from data_processing import process_data
+from typing import Optional
+from data_ingestion import ingest_data, default_store_path
+from async_ingestion import ingest_data_async
+from data_processing import process_data, cached_process_data
 from model import train_model, predict_next_gameweek
 
 # Configure logging
@@ -35,6 +38,8 @@ def plot_top100_price_vs_points(predictions: dict, player_gw_df: pd.DataFrame,
     pred_df['player_id'] = pred_df['player_id'].astype(int)
     
     # Get the latest record per player (assuming higher gameweek means more recent)
+    if 'season' in player_gw_df.columns:
+        player_gw_df = player_gw_df[player_gw_df['season'] == player_gw_df['season'].max()]
     latest_player = player_gw_df.sort_values('gameweek').groupby('player_id').tail(1)
     latest_player = latest_player[['player_id', 'value']]
     latest_player['dollar_value'] = latest_player['value'] / 10.0  # convert to dollars
@@ -108,13 +113,26 @@ def analyze_errors(model, X_test: np.ndarray, y_test: np.ndarray,
     logger.info("\nTop 10 Players with Largest Prediction Errors:")
     logger.info(top_errors[['full_name', 'gameweek', 'actual_points', 'predicted_points', 'error']])
 
-def main():
+def main(async_ingestion: bool = False, store: Optional[str] = None, streaming: bool = False,
+         feature_cache: bool = True):
+    """
+    Runs the full pipeline. `async_ingestion` downloads with ingest_data_async,
+    `store` ingests into and processes from that store, `streaming` streams
+    training batches, and `feature_cache` reuses processed features.
+    """
     logger.info("Starting data ingestion...")
-    ingest_data()
+    if async_ingestion:
+        asyncio.run(ingest_data_async(store=store))
+    else:
+        ingest_data(store=store)
     logger.info("Data ingestion completed.\n")
     
     logger.info("Starting data processing...")
-    data = process_data()
+    process = cached_process_data if feature_cache else process_data
+    if store is not None:
+        data = process(player_store=default_store_path("data", store), store_format=store)
+    else:
+        data = process()
     if data["X"] is None or data["y"] is None or data["player_gw_df"] is None:
         logger.error("No sequences created or no player gameweek data available. Exiting.")
         return
@@ -123,7 +141,7 @@ def main():
     logger.info("Starting model training...")
     X = data["X"]
     y = data["y"]
-    model, history = train_model(X, y)
+    model, history = train_model(X, y, streaming=streaming)
     logger.info("Model training completed.\n")
     
     logger.info("Predicting next gameweek fantasy points for each player...")
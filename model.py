@@ -4,6 +4,7 @@ import tensorflow as tf
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout
 from tensorflow.keras.callbacks import EarlyStopping
+from data_processing import rename_player_gw_columns
 
 def build_model(input_shape):
     model = Sequential()
@@ -16,40 +17,103 @@ def build_model(input_shape):
     model.compile(optimizer='adam', loss='mean_squared_error', metrics=['mae'])
     return model
 
-def train_model(X, y, epochs=50, batch_size=32, validation_split=0.2):
+def sequence_batches(X, y, indices, batch_size=32, shuffle=True, seed=None):
+    """
+    Yields (X_batch, y_batch) float32 arrays for the windows of X at 'indices', materializing one batch at a
+    time, so X can be a data_processing.SequenceWindows view that is never copied in full. With 'shuffle' the
+    indices are permuted first; shuffling indices rather than a buffer of windows gives a full shuffle for
+    one integer per window. 'seed' may be a numpy Generator, to draw a new order on every pass.
+    """
+    indices = np.asarray(indices)
+    if shuffle:
+        indices = np.random.default_rng(seed).permutation(indices)
+    for start in range(0, len(indices), batch_size):
+        batch = indices[start:start + batch_size]
+        yield np.asarray(X[batch], dtype=np.float32), np.asarray(y[batch], dtype=np.float32)
+
+def make_sequence_dataset(X, y, indices, batch_size=32, shuffle=True, seed=None):
+    """
+    Wraps sequence_batches in a prefetching tf.data.Dataset for model.fit/evaluate. Each epoch re-runs the
+    generator, and with 'shuffle' draws a new order of the windows.
+    """
+    rng = np.random.default_rng(seed)
+    dataset = tf.data.Dataset.from_generator(
+        lambda: sequence_batches(X, y, indices, batch_size, shuffle, rng),
+        output_signature=(tf.TensorSpec(shape=(None, X.shape[1], X.shape[2]), dtype=tf.float32),
+                          tf.TensorSpec(shape=(None,), dtype=tf.float32)))
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+def fit_streaming(model, X, y, train_index, epochs=50, batch_size=32, validation_split=0.2,
+                  callbacks=None, verbose=1):
+    """
+    model.fit on the windows of X at 'train_index', streamed batch by batch (see make_sequence_dataset).
+    As with Keras' validation_split, the last 'validation_split' of those windows are held out for validation.
+    """
+    n_val = int(len(train_index) * validation_split)
+    fit_index, val_index = train_index[:len(train_index) - n_val], train_index[len(train_index) - n_val:]
+    return model.fit(
+        make_sequence_dataset(X, y, fit_index, batch_size, seed=42),
+        epochs=epochs,
+        validation_data=make_sequence_dataset(X, y, val_index, batch_size, shuffle=False) if n_val else None,
+        callbacks=callbacks,
+        verbose=verbose
+    )
+
+def train_model(X, y, epochs=50, batch_size=32, validation_split=0.2, streaming=False):
+    """
+    Trains the LSTM on sequences X (n_windows x seq_length x features) and targets y, reports the test
+    loss/MAE, and cross-validates over 5 folds. With 'streaming', no split of X is ever materialized: the
+    train/test/fold splits are index arrays and every fit and evaluation streams batches from X (which can
+    be the lazy data_processing.SequenceWindows view process_data returns), so peak memory no longer grows
+    with the number of windows.
+    """
+    input_shape = (X.shape[1], X.shape[2])
     # Split the data into training and testing sets
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    if streaming:
+        train_index, test_index = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42)
+    else:
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
-    input_shape = (X_train.shape[1], X_train.shape[2])
     model = build_model(input_shape)
     model.summary()
     
     # Add early stopping to prevent overfitting
     early_stopping = EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True)
     
-    history = model.fit(
-        X_train, y_train,
-        epochs=epochs,
-        batch_size=batch_size,
-        validation_split=validation_split,
-        callbacks=[early_stopping],
-        verbose=1
-    )
+    if streaming:
+        history = fit_streaming(model, X, y, train_index, epochs, batch_size, validation_split,
+                                callbacks=[early_stopping])
+        loss, mae = model.evaluate(make_sequence_dataset(X, y, test_index, batch_size, shuffle=False),
+                                   verbose=0)
+    else:
+        history = model.fit(
+            X_train, y_train,
+            epochs=epochs,
+            batch_size=batch_size,
+            validation_split=validation_split,
+            callbacks=[early_stopping],
+            verbose=1
+        )
     
-    # Evaluate the model on test data
-    loss, mae = model.evaluate(X_test, y_test, verbose=0)
+        # Evaluate the model on test data
+        loss, mae = model.evaluate(X_test, y_test, verbose=0)
     print("Test Loss: {:.4f}, Test MAE: {:.4f}".format(loss, mae))
     
     # Optionally, perform K-Fold cross validation
     kf = KFold(n_splits=5, shuffle=True, random_state=42)
     cv_losses = []
     cv_maes = []
-    for train_index, test_index in kf.split(X):
-        X_cv_train, X_cv_test = X[train_index], X[test_index]
-        y_cv_train, y_cv_test = y[train_index], y[test_index]
+    for train_index, test_index in kf.split(np.arange(len(y))):
         cv_model = build_model(input_shape)
-        cv_model.fit(X_cv_train, y_cv_train, epochs=epochs, batch_size=batch_size, validation_split=validation_split, verbose=0)
-        loss_cv, mae_cv = cv_model.evaluate(X_cv_test, y_cv_test, verbose=0)
+        if streaming:
+            fit_streaming(cv_model, X, y, train_index, epochs, batch_size, validation_split, verbose=0)
+            loss_cv, mae_cv = cv_model.evaluate(
+                make_sequence_dataset(X, y, test_index, batch_size, shuffle=False), verbose=0)
+        else:
+            X_cv_train, X_cv_test = X[train_index], X[test_index]
+            y_cv_train, y_cv_test = y[train_index], y[test_index]
+            cv_model.fit(X_cv_train, y_cv_train, epochs=epochs, batch_size=batch_size, validation_split=validation_split, verbose=0)
+            loss_cv, mae_cv = cv_model.evaluate(X_cv_test, y_cv_test, verbose=0)
         cv_losses.append(loss_cv)
         cv_maes.append(mae_cv)
     print("Cross Validation Loss: {:.4f} ± {:.4f}".format(np.mean(cv_losses), np.std(cv_losses)))
@@ -57,13 +121,26 @@ def train_model(X, y, epochs=50, batch_size=32, validation_split=0.2):
     
     return model, history
 
-def predict_next_gameweek(model, player_gw_df, seq_length=5, feature_cols=['minutes', 'goals', 'assists']):
+def predict_next_gameweek(model, player_gw_df=None, seq_length=5, feature_cols=['minutes', 'goals', 'assists'],
+                          player_ids=None, loader=None, scaler=None):
     """
     For each player in the aggregated gameweek data, extract the most recent sequence of length 'seq_length'
     and use the trained model to predict the fantasy points for the next gameweek.
-    Returns a dictionary mapping player_id to predicted fantasy points.
+    Returns a dictionary mapping player_id to predicted fantasy points (latest season only).
+    With 'player_ids' and a LazyPlayerLoader as 'loader', only those players are loaded and scaled with 'scaler'.
     """
     predictions = {}
+    if player_gw_df is None and loader is not None:
+        player_gw_df = loader.load(player_ids)
+        if player_gw_df is None:
+            return predictions
+        player_gw_df = rename_player_gw_columns(player_gw_df)
+        if scaler is not None:
+            player_gw_df[feature_cols] = scaler.transform(player_gw_df[feature_cols])
+    elif player_ids is not None:
+        player_gw_df = player_gw_df[player_gw_df['player_id'].isin(player_ids)]
+    if 'season' in player_gw_df.columns:
+        player_gw_df = player_gw_df[player_gw_df['season'] == player_gw_df['season'].max()]
     # Ensure data is sorted by player_id and gameweek
     sorted_df = player_gw_df.sort_values(['player_id', 'gameweek'])
     for player in sorted_df['player_id'].unique():
@@ -0,0 +1,314 @@
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlsplit, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+import pandas as pd
+
+# Per-player gameweek columns, in the order upstream gw.csv files use
+GW_COLUMNS = ["element", "fixture", "opponent_team", "total_points", "was_home", "kickoff_time",
+              "team_h_score", "team_a_score", "round", "minutes", "goals_scored", "assists",
+              "clean_sheets", "goals_conceded", "own_goals", "penalties_saved", "penalties_missed",
+              "yellow_cards", "red_cards", "saves", "bonus", "bps", "influence", "creativity",
+              "threat", "ict_index", "value", "transfers_balance", "selected", "transfers_in",
+              "transfers_out"]
+
+POSITIONS = {1: "GK", 2: "DEF", 3: "MID", 4: "FWD"}
+
+def git_blob_sha(content):
+    """SHA-1 git uses for a blob with this content, as reported by the GitHub API."""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+def _csv_bytes(df):
+    return df.to_csv(index=False).encode("utf-8")
+
+def build_season_tree(n_players, gameweeks=38, n_teams=20, seed=0):
+    """
+    Build a synthetic season data directory shaped like the
+    Fantasy-Premier-League repository: key files, understat/, players/ and
+    gws/. Returns a dict mapping relative path to file bytes.
+    """
+    rng = np.random.default_rng(seed)
+    tree = {}
+    team_ids = np.arange(1, n_teams + 1)
+    tree["teams.csv"] = _csv_bytes(pd.DataFrame({
+        "id": team_ids, "name": [f"Team {i}" for i in team_ids],
+        "short_name": [f"T{i:02d}" for i in team_ids],
+        "strength": rng.integers(2, 6, n_teams),
+        "strength_defence_home": rng.integers(1000, 1400, n_teams),
+        "strength_defence_away": rng.integers(1000, 1400, n_teams)}))
+
+    fixtures = []
+    for event in range(1, gameweeks + 1):
+        order = rng.permutation(team_ids)
+        for i in range(0, n_teams - 1, 2):
+            home_goals, away_goals = rng.integers(0, 4, 2)
+            stats = [{"identifier": "goals_scored",
+                      "a": [{"value": int(away_goals), "element": int(rng.integers(1, n_players + 1))}]
+                      if away_goals else [],
+                      "h": [{"value": int(home_goals), "element": int(rng.integers(1, n_players + 1))}]
+                      if home_goals else []},
+                     {"identifier": "bonus", "a": [{"value": 1, "element": 1}],
+                      "h": [{"value": 3, "element": 2}]}]
+            fixtures.append({"id": len(fixtures) + 1, "event": event, "finished": True,
+                             "team_h": int(order[i]), "team_a": int(order[i + 1]),
+                             "team_h_score": int(home_goals), "team_a_score": int(away_goals),
+                             "kickoff_time": f"2024-08-{(event % 28) + 1:02d}T14:00:00Z",
+                             "stats": repr(stats)})
+    fixtures_df = pd.DataFrame(fixtures)
+    tree["fixtures.csv"] = _csv_bytes(fixtures_df)
+
+    player_ids = np.arange(1, n_players + 1)
+    first_names = [f"First{i}" for i in player_ids]
+    second_names = [f"Second{i}" for i in player_ids]
+    element_types = rng.integers(1, 5, n_players)
+    player_teams = rng.integers(1, n_teams + 1, n_players)
+    tree["player_idlist.csv"] = _csv_bytes(pd.DataFrame(
+        {"first_name": first_names, "second_name": second_names, "id": player_ids}))
+    tree["players_raw.csv"] = _csv_bytes(pd.DataFrame({
+        "id": player_ids, "first_name": first_names, "second_name": second_names,
+        "element_type": element_types, "team": player_teams,
+        "now_cost": rng.integers(40, 130, n_players)}))
+
+    tree["understat/understat_player.csv"] = _csv_bytes(pd.DataFrame({
+        "id": player_ids, "player_name": [f"{a} {b}" for a, b in zip(first_names, second_names)],
+        "games": rng.integers(0, gameweeks, n_players), "xG": rng.random(n_players).round(3)}))
+    for team in team_ids:
+        tree[f"understat/understat_Team_{team}.csv"] = _csv_bytes(pd.DataFrame({
+            "h_a": rng.choice(["h", "a"], gameweeks), "xG": rng.random(gameweeks).round(3),
+            "xGA": rng.random(gameweeks).round(3)}))
+
+    # One row per player per gameweek, in fixture order
+    n_rows = n_players * gameweeks
+    minutes = rng.choice([0, 0, 15, 45, 60, 90, 90, 90], n_rows)
+    played = minutes > 0
+    gw = pd.DataFrame({
+        "element": np.repeat(player_ids, gameweeks),
+        "fixture": np.tile(np.arange(1, gameweeks + 1), n_players),
+        "opponent_team": rng.integers(1, n_teams + 1, n_rows),
+        "total_points": np.where(played, rng.integers(1, 15, n_rows), 0),
+        "was_home": rng.random(n_rows) < 0.5,
+        "kickoff_time": np.tile([f"2024-08-{(e % 28) + 1:02d}T14:00:00Z"
+                                 for e in range(1, gameweeks + 1)], n_players),
+        "team_h_score": rng.integers(0, 4, n_rows),
+        "team_a_score": rng.integers(0, 4, n_rows),
+        "round": np.tile(np.arange(1, gameweeks + 1), n_players),
+        "minutes": minutes,
+        "goals_scored": np.where(played, rng.poisson(0.15, n_rows), 0),
+        "assists": np.where(played, rng.poisson(0.1, n_rows), 0),
+    })
+    for col in GW_COLUMNS:
+        if col not in gw.columns:
+            gw[col] = rng.integers(0, 10, n_rows) if col not in (
+                "influence", "creativity", "threat", "ict_index") else rng.random(n_rows).round(1)
+    gw["value"] = np.repeat(rng.integers(40, 130, n_players), gameweeks)
+    gw["selected"] = rng.integers(0, 5_000_000, n_rows)
+    gw = gw[GW_COLUMNS]
+    for player_id, player_gw in gw.groupby("element", sort=True):
+        idx = player_id - 1
+        folder = f"{first_names[idx]}_{second_names[idx]}_{player_id}"
+        tree[f"players/{folder}/gw.csv"] = _csv_bytes(player_gw)
+
+    merged = gw.copy()
+    merged.insert(0, "name", np.repeat([f"{a} {b}" for a, b in zip(first_names, second_names)],
+                                       gameweeks))
+    merged.insert(1, "position", np.repeat([POSITIONS[t] for t in element_types], gameweeks))
+    merged.insert(2, "team", np.repeat([f"Team {t}" for t in player_teams], gameweeks))
+    merged.insert(3, "xP", rng.random(n_rows).round(1))
+    # Like upstream, the gameweek files list the stats in alphabetical order
+    # and merged_gw.csv adds a trailing GW column
+    merged = merged[["name", "position", "team", "xP"] + sorted(GW_COLUMNS)]
+    merged = merged.sort_values("round", kind="stable")
+    for event, event_df in merged.groupby("round"):
+        tree[f"gws/gw{event}.csv"] = _csv_bytes(event_df)
+    tree["gws/merged_gw.csv"] = _csv_bytes(merged.assign(GW=merged["round"]))
+    return tree
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, keep-alive
+    # responses stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            if self.server.stub.body_latency:
+                # Send the headers first, then the body after a pause, as a slow transfer would
+                self.wfile.flush()
+                time.sleep(self.server.stub.body_latency * random.uniform(0.5, 1.5))
+            self.wfile.write(body)
+
+    def do_GET(self):
+        stub = self.server.stub
+        if not stub.begin_request():
+            self._send(429, headers={"Retry-After": str(stub.retry_after)})
+            return
+        try:
+            if stub.latency:
+                time.sleep(stub.latency * random.uniform(0.5, 1.5))
+            if stub.error_rate and random.random() < stub.error_rate:
+                self._send(503)
+                return
+            self._route(stub, unquote(urlsplit(self.path).path))
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up on the request (e.g. a cancelled download)
+            self.close_connection = True
+        finally:
+            stub.end_request()
+
+    def _route(self, stub, path):
+        raw = re.match(r"/raw/([^/]+)/(.+)$", path)
+        contents = re.match(r"/repos/[^/]+/[^/]+/contents/data/([^/]+)/?(.*)$", path)
+        tree = re.match(r"/repos/[^/]+/[^/]+/git/trees/master:data/([^/]+)/?(.*)$", path)
+        if raw:
+            content = stub.seasons.get(raw.group(1), {}).get(raw.group(2))
+            if content is None:
+                self._send(404)
+                return
+            etag = '"{}"'.format(git_blob_sha(content))
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, headers={"ETag": etag})
+                return
+            self._send(200, content, {"ETag": etag, "Content-Type": "text/plain; charset=utf-8"})
+        elif contents or tree:
+            match = contents or tree
+            listing = (stub.list_dir if contents else stub.list_tree)(match.group(1), match.group(2))
+            if listing is None:
+                self._send(404)
+                return
+            self._send(200, json.dumps(listing).encode("utf-8"), {"Content-Type": "application/json"})
+        else:
+            self._send(404)
+
+class StubFPLServer:
+    """
+    Local HTTP stand-in for the Fantasy-Premier-League repository: raw files
+    with ETags and GitHub contents/git trees listings, with optional latency,
+    `body_latency`, 503 errors and a 429 concurrency cap. `max_active` is the
+    most requests ever in flight.
+    """
+    def __init__(self, n_players=100, seasons=("2024-25",), gameweeks=38, latency=0.0,
+                 error_rate=0.0, max_concurrency=None, retry_after=1, host="127.0.0.1", port=0,
+                 body_latency=0.0):
+        self.seasons = {season: build_season_tree(n_players, gameweeks, seed=i)
+                        for i, season in enumerate(seasons)}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_concurrency = max_concurrency
+        self.retry_after = retry_after
+        self.body_latency = body_latency
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    @property
+    def raw_url(self):
+        """Parent of the per-season raw directories (the `source` for multi-season ingestion)."""
+        return self.base_url + "/raw/"
+
+    @property
+    def api_url(self):
+        """Parent of the per-season contents API directories."""
+        return self.base_url + "/repos/vaastav/Fantasy-Premier-League/contents/data/"
+
+    def begin_request(self):
+        with self._lock:
+            self.requests += 1
+            if self.max_concurrency and self.active >= self.max_concurrency:
+                return False
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            return True
+
+    def end_request(self):
+        with self._lock:
+            self.active -= 1
+
+    def list_dir(self, season, relative_dir):
+        tree = self.seasons.get(season)
+        if tree is None:
+            return None
+        prefix = relative_dir.strip("/") + "/" if relative_dir.strip("/") else ""
+        entries = {}
+        for path, content in tree.items():
+            if path.startswith(prefix):
+                child, _, rest = path[len(prefix):].partition("/")
+                entries[child] = None if rest else content
+        if not entries:
+            return None
+        listing = []
+        for name, content in sorted(entries.items()):
+            item = {"name": name, "path": prefix + name, "type": "dir" if content is None else "file"}
+            if content is not None:
+                item.update(sha=git_blob_sha(content), size=len(content),
+                            download_url="{}/raw/{}/{}{}".format(self.base_url, season, prefix, name))
+            listing.append(item)
+        return listing
+
+    def list_tree(self, season, relative_dir):
+        """Recursive git trees API listing of `relative_dir` in `season`, blobs only."""
+        tree = self.seasons.get(season)
+        if tree is None:
+            return None
+        prefix = relative_dir.strip("/") + "/" if relative_dir.strip("/") else ""
+        blobs = [{"path": path[len(prefix):], "mode": "100644", "type": "blob",
+                  "sha": git_blob_sha(content), "size": len(content)}
+                 for path, content in sorted(tree.items()) if path.startswith(prefix)]
+        if not blobs:
+            return None
+        return {"sha": git_blob_sha(relative_dir.encode("utf-8")), "tree": blobs, "truncated": False}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a synthetic Fantasy-Premier-League data tree.")
+    parser.add_argument("--players", type=int, default=700)
+    parser.add_argument("--seasons", nargs="+", default=["2024-25"])
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean response delay in seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 503.")
+    parser.add_argument("--max-concurrency", type=int, default=None,
+                        help="Answer 429 to requests beyond this many in flight.")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    stub = StubFPLServer(args.players, args.seasons, latency=args.latency, error_rate=args.error_rate,
+                         max_concurrency=args.max_concurrency, port=args.port)
+    print("Serving {} players for {} at {}".format(args.players, ", ".join(args.seasons), stub.base_url))
+    print("  python data_ingestion.py --source {}{} --api-url {}{}".format(
+        stub.raw_url, args.seasons[-1], stub.api_url, args.seasons[-1]))
+    stub.httpd.serve_forever()
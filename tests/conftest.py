@@ -0,0 +1,59 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import StubFPLServer, build_season_tree
+
+SEASON = "2024-25"
+
+# Small enough for every test to ingest a whole season in well under a second
+N_PLAYERS = 12
+GAMEWEEKS = 8
+
+def write_tree(root, tree):
+    """Write a build_season_tree dict under `root` as a local mirror of the season directory."""
+    for path, content in tree.items():
+        local_path = os.path.join(root, *path.split("/"))
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        with open(local_path, "wb") as f:
+            f.write(content)
+    return str(root)
+
+def player_files(data_dir):
+    """Bytes of every players/<folder>/gw.csv under `data_dir`, keyed by folder."""
+    players_dir = os.path.join(data_dir, "players")
+    files = {}
+    for folder in sorted(os.listdir(players_dir)):
+        gw_path = os.path.join(players_dir, folder, "gw.csv")
+        if os.path.exists(gw_path):
+            with open(gw_path, "rb") as f:
+                files[folder] = f.read()
+    return files
+
+@pytest.fixture(scope="session")
+def season_tree():
+    return build_season_tree(N_PLAYERS, GAMEWEEKS)
+
+@pytest.fixture(scope="session")
+def stub():
+    with StubFPLServer(N_PLAYERS, [SEASON], gameweeks=GAMEWEEKS) as server:
+        yield server
+
+@pytest.fixture
+def stub_source(stub):
+    """ingest_data keyword arguments that point it at the stub server's season."""
+    return {"source": stub.raw_url + SEASON, "api_url": stub.api_url + SEASON}
+
+@pytest.fixture
+def mirror(tmp_path, season_tree):
+    return write_tree(tmp_path / "mirror", season_tree)
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """A fresh working directory; ingestion writes to its relative data/ directory."""
+    work_dir = tmp_path / "work"
+    work_dir.mkdir()
+    monkeypatch.chdir(work_dir)
+    return work_dir
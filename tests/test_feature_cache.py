@@ -0,0 +1,72 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from data_ingestion import ingest_data
+from data_processing import cached_process_data, evict_feature_cache
+
+@pytest.fixture
+def ingested(workdir, mirror):
+    ingest_data(source=mirror)
+    return os.path.join(str(workdir), "data", "feature_cache")
+
+def entries(cache_dir):
+    return sorted(name for name in os.listdir(cache_dir) if ".tmp-" not in name)
+
+def test_second_call_is_served_from_the_cache(ingested, capsys):
+    data = cached_process_data(cache_dir=ingested, seq_length=3)
+    assert "Loaded processed features" not in capsys.readouterr().out
+    cached = cached_process_data(cache_dir=ingested, seq_length=3)
+    assert "Loaded processed features from cache entry" in capsys.readouterr().out
+
+    assert len(entries(ingested)) == 1
+    np.testing.assert_array_equal(np.asarray(cached["X"]), np.asarray(data["X"]))
+    np.testing.assert_array_equal(cached["y"], data["y"])
+    for name in ("player_gw_df", "fixtures_df", "teams_df"):
+        pd.testing.assert_frame_equal(cached[name], data[name])
+
+def test_changed_input_misses_the_cache(ingested, capsys):
+    cached_process_data(cache_dir=ingested, seq_length=3)
+    gw_path = os.path.join("data", "players", "First2_Second2_2", "gw.csv")
+    gw_df = pd.read_csv(gw_path)
+    gw_df.loc[0, "total_points"] += 1
+    gw_df.to_csv(gw_path, index=False)
+    capsys.readouterr()
+
+    cached_process_data(cache_dir=ingested, seq_length=3)
+    assert "Loaded processed features" not in capsys.readouterr().out
+    assert len(entries(ingested)) == 2
+
+def test_least_recently_used_entries_are_evicted(ingested):
+    keys = []
+    for seq_length in (2, 3, 4):
+        cached_process_data(cache_dir=ingested, seq_length=seq_length)
+        keys += set(entries(ingested)) - set(keys)
+    assert len(keys) == 3
+
+    # Use seq_length=2 last, so seq_length=3 is the least recently used entry
+    for age, key in enumerate(keys):
+        os.utime(os.path.join(ingested, key, "meta.json"), (1000 + age, 1000 + age))
+    cached_process_data(cache_dir=ingested, seq_length=2)
+    sizes = {key: sum(os.path.getsize(os.path.join(root, name))
+                      for root, _, names in os.walk(os.path.join(ingested, key)) for name in names)
+             for key in keys}
+    assert evict_feature_cache(ingested, sizes[keys[0]] + sizes[keys[2]], keep=keys[2]) == 1
+    assert entries(ingested) == sorted([keys[0], keys[2]])
+
+    # The entry just written is kept even when it alone is over the limit
+    assert evict_feature_cache(ingested, 1, keep=keys[2]) == 1
+    assert entries(ingested) == [keys[2]]
+
+def test_incomplete_entry_is_replaced(ingested, capsys):
+    cached_process_data(cache_dir=ingested, seq_length=3)
+    key = entries(ingested)[0]
+    os.remove(os.path.join(ingested, key, "meta.json"))
+    assert evict_feature_cache(ingested, 1) == 0
+    capsys.readouterr()
+
+    data = cached_process_data(cache_dir=ingested, seq_length=3)
+    assert "Loaded processed features" not in capsys.readouterr().out
+    assert os.path.exists(os.path.join(ingested, key, "meta.json"))
+    cached = cached_process_data(cache_dir=ingested, seq_length=3)
+    np.testing.assert_array_equal(np.asarray(cached["X"]), np.asarray(data["X"]))
@@ -0,0 +1,121 @@
+import os
+import asyncio
+import pytest
+import pandas as pd
+from data_sources import LocalDirectorySource
+from data_ingestion import (IngestManifest, IngestJournal, ingest_data, MANIFEST_FILE,
+                            JOURNAL_FILE)
+from conftest import player_files
+
+class CountingSource(LocalDirectorySource):
+    """A local mirror that records every path opened and can fail on one of them."""
+    def __init__(self, root, fail_on=None):
+        super().__init__(root)
+        self.opened = []
+        self.fail_on = fail_on
+
+    def open(self, relative_path, entry=None, url=None):
+        if relative_path == self.fail_on:
+            raise KeyboardInterrupt
+        self.opened.append(relative_path)
+        return super().open(relative_path, entry, url)
+
+def test_manifest_commits_only_saved_entries(tmp_path):
+    path = str(tmp_path / MANIFEST_FILE)
+    manifest = IngestManifest(path)
+    source_file = type("SourceFile", (), {"etag": '"abc"', "last_modified": None})()
+    manifest.record("teams.csv", source_file, "hash1")
+    manifest.record("fixtures.csv", source_file, "hash2")
+    manifest.commit("teams.csv")
+    manifest.record_blob_sha("teams.csv", "sha1")
+    manifest.save()
+
+    entries = IngestManifest(path).entries
+    assert set(entries) == {"teams.csv"}
+    assert entries["teams.csv"] == {"etag": '"abc"', "last_modified": None, "sha256": "hash1",
+                                    "blob_sha": "sha1"}
+
+def test_journal_survives_reopening_and_clears(tmp_path):
+    path = str(tmp_path / JOURNAL_FILE)
+    journal = IngestJournal(path)
+    assert not journal.resumed
+    journal.mark("teams.csv")
+    journal.mark("players/A_B_1/gw.csv")
+    journal.close()
+
+    reopened = IngestJournal(path)
+    assert reopened.resumed
+    assert "players/A_B_1/gw.csv" in reopened and "fixtures.csv" not in reopened
+    reopened.clear()
+    assert not os.path.exists(path)
+
+def test_interrupted_run_resumes_from_journal(workdir, mirror):
+    interrupted = CountingSource(mirror, fail_on="players/First6_Second6_6/gw.csv")
+    with pytest.raises(KeyboardInterrupt):
+        ingest_data(source=interrupted)
+    journal = IngestJournal(os.path.join("data", JOURNAL_FILE))
+    assert "players/First5_Second5_5/gw.csv" in journal
+    assert "players/First6_Second6_6/gw.csv" not in journal
+
+    resumed = CountingSource(mirror)
+    ingest_data(source=resumed)
+    assert not set(resumed.opened) & journal.done
+    assert "players/First6_Second6_6/gw.csv" in resumed.opened
+    assert not os.path.exists(os.path.join("data", JOURNAL_FILE))
+    assert len(player_files("data")) == 12
+
+def test_unchanged_files_are_not_requested_again(workdir, stub_source):
+    ingest_data(**stub_source)
+    with open(os.path.join("data", MANIFEST_FILE), encoding='utf-8') as f:
+        assert "players/First1_Second1_1/gw.csv" in f.read()
+    before = player_files("data")
+
+    stats = ingest_data(**stub_source)
+    assert stats["metrics"]["fetched"] == 0
+    assert player_files("data") == before
+
+def ingest_in(directory, monkeypatch, **kwargs):
+    directory.mkdir()
+    monkeypatch.chdir(directory)
+    ingest_data(use_cache=False, **kwargs)
+    return player_files("data")
+
+def test_bulk_matches_per_player_ingestion(tmp_path, monkeypatch, stub_source):
+    per_player = ingest_in(tmp_path / "per_player", monkeypatch, **stub_source)
+    bulk = ingest_in(tmp_path / "bulk", monkeypatch, bulk=True, **stub_source)
+    assert len(per_player) == 12
+    assert bulk == per_player
+
+def roll_back(data_dir, last_round, remove_first=True):
+    """Cut every local player file back to `last_round`, and remove the first player's file."""
+    players_dir = os.path.join(data_dir, "players")
+    for i, folder in enumerate(sorted(os.listdir(players_dir))):
+        gw_path = os.path.join(players_dir, folder, "gw.csv")
+        if i == 0 and remove_first:
+            os.remove(gw_path)
+            continue
+        gw_df = pd.read_csv(gw_path)
+        gw_df[gw_df["round"] <= last_round].to_csv(gw_path, index=False)
+
+def test_incremental_refresh_matches_full_ingestion(workdir, stub, stub_source):
+    ingest_data(**stub_source)
+    full = player_files("data")
+    roll_back("data", last_round=5)
+
+    requests_before = stub.requests
+    ingest_data(incremental=True, **stub_source)
+    assert player_files("data") == full
+    # Listings, gameweeks 5-8 and the one player without a local file
+    assert stub.requests - requests_before == 2 + 4 + 1
+
+def test_async_incremental_refresh_matches_full_ingestion(workdir, stub_source):
+    pytest.importorskip("aiohttp")
+    from async_ingestion import ingest_data_async, AsyncDownloadScheduler
+    asyncio.run(ingest_data_async(**stub_source))
+    full = player_files("data")
+    roll_back("data", last_round=5)
+
+    scheduler = AsyncDownloadScheduler(2)
+    asyncio.run(ingest_data_async(incremental=True, scheduler=scheduler, **stub_source))
+    assert player_files("data") == full
+    assert scheduler.status()["in_flight"] == 0
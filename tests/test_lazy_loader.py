@@ -0,0 +1,63 @@
+import os
+import shutil
+import pytest
+import data_ingestion
+from data_sources import LocalDirectorySource
+from data_ingestion import LazyPlayerLoader
+
+def move_aside(mirror, relative_path):
+    """Hide a file or directory of the mirror; returns a function that puts it back."""
+    path = os.path.join(mirror, *relative_path.split("/"))
+    hidden = path + ".hidden"
+    os.rename(path, hidden)
+    return lambda: os.rename(hidden, path)
+
+def test_player_idlist_is_fetched_again_after_failing(workdir, mirror, capsys):
+    restore = move_aside(mirror, "player_idlist.csv")
+    with LazyPlayerLoader(source=LocalDirectorySource(mirror)) as loader:
+        assert loader.get(3) is None
+        assert "No player_idlist.csv to look up player 3." in capsys.readouterr().out
+        restore()
+        player_gw_df = loader.get(3)
+        assert set(player_gw_df["player_id"]) == {3}
+        assert len(player_gw_df) == 8
+        assert loader.fetched == 1
+
+def test_missing_player_file_is_fetched_again(workdir, mirror):
+    restore = move_aside(mirror, "players/First3_Second3_3")
+    with LazyPlayerLoader(source=LocalDirectorySource(mirror)) as loader:
+        assert loader.get(3) is None
+        restore()
+        assert len(loader.get(3)) == 8
+        assert loader.fetched == 1
+
+def test_raising_download_is_retried(workdir, mirror, monkeypatch):
+    ingest_player_gw = data_ingestion.ingest_player_gw
+    calls = []
+
+    def flaky_ingest_player_gw(*args, **kwargs):
+        calls.append(args[0]["id"])
+        if len(calls) == 1:
+            raise ConnectionError("connection reset")
+        return ingest_player_gw(*args, **kwargs)
+
+    monkeypatch.setattr(data_ingestion, "ingest_player_gw", flaky_ingest_player_gw)
+    with LazyPlayerLoader(source=LocalDirectorySource(mirror)) as loader:
+        with pytest.raises(ConnectionError):
+            loader.get(5)
+        assert len(loader.get(5)) == 8
+    assert calls == [5, 5]
+
+def test_players_are_downloaded_once(workdir, mirror):
+    with LazyPlayerLoader(source=LocalDirectorySource(mirror), max_workers=4) as loader:
+        loader.prefetch([1, 2, 3])
+        player_gw_df = loader.load([1, 2, 3, 1])
+        assert list(player_gw_df["player_id"].unique()) == [1, 2, 3]
+        loader.get(2)
+        assert loader.fetched == 3
+
+    # Files already saved locally are used as they are
+    shutil.rmtree(mirror)
+    with LazyPlayerLoader(source=LocalDirectorySource(mirror)) as loader:
+        assert len(loader.load([1, 2, 3])) == 24
+        assert loader.fetched == 0